@@ -0,0 +1,319 @@
+"""
+Route-level benchmark and load test.
+
+Drives the Flask app in-process against the local in-memory data backend
+(DATA_BACKEND=memory), with a simulated round trip added to every query and
+storage call. Each scenario is run sequentially for allocation figures and
+then under concurrent load for latency percentiles and throughput. Results
+are written as JSON and can be compared against an earlier run:
+
+    python api/benchmark.py --latency-ms 40 --concurrency 8 --output bench.json
+    python api/benchmark.py --baseline bench.json --fail-over 15
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORK_DIR = tempfile.mkdtemp(prefix="e-looc-bench-")
+ADMIN_USERNAME = "bench-admin"
+ADMIN_PASSWORD = "bench-password"
+
+
+def configure_environment():
+    # Must run before main is imported: the backend and background jobs are chosen at import time.
+    os.environ.update({
+        "DATA_BACKEND": "memory",
+        "LOCAL_STORAGE_DIR": os.path.join(WORK_DIR, "storage"),
+        "SEARCH_SNAPSHOT_PATH": os.path.join(WORK_DIR, "search.json.gz"),
+        "STORAGE_JOB_LOG": os.path.join(WORK_DIR, "storage-jobs.jsonl"),
+        "STATUS_EVENTS_SOURCE": "local",
+        "ORPHAN_SWEEP_INTERVAL": "0",
+        "LOGIN_THROTTLE": "off",  # every simulated login comes from the same address
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "benchmark"),
+    })
+    sys.path.insert(0, HERE)
+
+
+def seed(main, posts):
+    from werkzeug.security import generate_password_hash
+
+    now = datetime.now(timezone.utc)
+    rows = {
+        "users": [{
+            "username": ADMIN_USERNAME,
+            "password_hash": generate_password_hash(ADMIN_PASSWORD),
+            "name": "Benchmark Admin",
+            "role": "admin",
+        }],
+        "patch_notes": [
+            {"title": f"Release {i}", "notes": "Fixes and improvements.", "date": (now - timedelta(days=i)).date().isoformat()}
+            for i in range(10)
+        ],
+        "system_maintenance": [{
+            "title": "Scheduled maintenance",
+            "description": "Database upgrade.",
+            "start_time": (now + timedelta(days=1)).isoformat(),
+            "end_time": (now + timedelta(days=1, hours=2)).isoformat(),
+        }],
+    }
+    for table_name in ("bulletin_posts", "news_posts"):
+        rows[table_name] = [{
+            "title": f"Anunsyo {i} para sa barangay",
+            "content": "Paalala sa lahat ng residente ng Barangay Looc. " * 8,
+            "is_active": i % 5 != 0,
+            "date_posted": (now - timedelta(hours=i)).isoformat(),
+            "created_by": 1,
+        } for i in range(posts)]
+    main.data_client.seed(rows)
+
+
+def sample_jpeg():
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", (1600, 1200), (40, 120, 200)).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+def logged_in_client(app):
+    client = app.test_client()
+    resp = client.post("/admin/login", data={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    if resp.status_code != 302:
+        raise RuntimeError(f"Benchmark login failed with status {resp.status_code}")
+    return client
+
+
+def build_scenarios(main, jpeg):
+    """name -> (needs login, request function, expected status)"""
+    counter = iter(range(10 ** 9))
+    # Cursor for the second page of news, so the keyset query runs with a filter.
+    older_cursor = main.encode_cursor(
+        main.supabase.table("news_posts").select("id, date_posted")
+        .order("date_posted", desc=True).order("id", desc=True).range(19, 19).execute().data[0]
+    )
+
+    def create_with_upload(client):
+        return client.post(
+            "/admin/bulletins/create",
+            data={
+                "title": f"Bench upload {next(counter)}",
+                "content": "Benchmark post with an image.",
+                "is_active": "on",
+                "image": (io.BytesIO(jpeg), "bench.jpg", "image/jpeg"),
+            },
+            content_type="multipart/form-data",
+        )
+
+    def edit_post(client):
+        return client.post(
+            "/admin/bulletins/edit/1",
+            data={"title": f"Anunsyo edited {next(counter)}", "content": "Updated content.", "is_active": "on"},
+        )
+
+    def login(client):
+        # A fresh session each time; an authenticated one is redirected before the hash check.
+        return main.app.test_client().post("/admin/login", data={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+
+    return {
+        "home": (False, lambda c: c.get("/"), 200),
+        "about": (False, lambda c: c.get("/about"), 200),
+        "credits": (False, lambda c: c.get("/credits"), 200),
+        "login": (False, login, 302),
+        "admin_dashboard": (True, lambda c: c.get("/admin/dashboard"), 200),
+        "admin_bulletins": (True, lambda c: c.get("/admin/bulletins"), 200),
+        "admin_news_older_page": (True, lambda c: c.get(f"/admin/news?limit=20&after={older_cursor}"), 200),
+        "admin_edit_form": (True, lambda c: c.get("/admin/bulletins/edit/1"), 200),
+        "admin_edit_submit": (True, edit_post, 302),
+        "admin_create_upload": (True, create_with_upload, 302),
+        "api_status": (True, lambda c: c.get("/api/status"), 200),
+        "api_search": (False, lambda c: c.get("/api/search?q=barangay+paala"), 200),
+        "api_patch_notes": (True, lambda c: c.get("/api/patch-notes"), 200),
+        "api_maintenance_latest": (True, lambda c: c.get("/api/system-maintenance/latest"), 200),
+    }
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+def measure_allocations(request, client, samples):
+    """Median peak traced allocation (KiB) of one request, measured sequentially."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(samples):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            request(client)
+            peaks.append((tracemalloc.get_traced_memory()[1] - before) / 1024)
+    finally:
+        tracemalloc.stop()
+    peaks.sort()
+    return round(percentile(peaks, 50), 1)
+
+
+def run_load(app, needs_login, request, expected_status, total, concurrency):
+    per_worker = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(concurrency + 1)
+
+    def worker(count):
+        client = logged_in_client(app) if needs_login else app.test_client()
+        timings, failures = [], []
+        barrier.wait()
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                status = request(client).status_code
+            except Exception as e:
+                failures.append(f"{type(e).__name__}: {e}")
+                continue
+            timings.append(time.perf_counter() - started)
+            if status != expected_status:
+                failures.append(f"status {status}")
+        with lock:
+            latencies.extend(timings)
+            errors.extend(failures)
+
+    threads = [threading.Thread(target=worker, args=(count,)) for count in per_worker]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "requests": total,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": round(percentile(ms, 50), 2) if ms else None,
+            "p95": round(percentile(ms, 95), 2) if ms else None,
+            "p99": round(percentile(ms, 99), 2) if ms else None,
+            "mean": round(sum(ms) / len(ms), 2) if ms else None,
+            "max": round(ms[-1], 2) if ms else None,
+        },
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    configure_environment()
+    import main
+
+    main.app.logger.setLevel("WARNING")
+    seed(main, args.posts)
+    main.data_client.latency = main.data_client.storage.latency = args.latency_ms / 1000
+
+    scenarios = build_scenarios(main, sample_jpeg())
+    selected = args.scenarios or list(scenarios)
+    unknown = set(selected) - set(scenarios)
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(sorted(unknown))}. Choose from: {', '.join(scenarios)}")
+
+    results = {}
+    for name in selected:
+        needs_login, request, expected_status = scenarios[name]
+        client = logged_in_client(main.app) if needs_login else main.app.test_client()
+        for _ in range(args.warmup):
+            request(client)
+        result = run_load(main.app, needs_login, request, expected_status, args.requests, args.concurrency)
+        result["alloc_peak_kib"] = measure_allocations(request, client, args.alloc_samples)
+        results[name] = result
+        print(f"  {name:<24} p50 {result['latency_ms']['p50']:>8} ms  p95 {result['latency_ms']['p95']:>8} ms  "
+              f"{result['throughput_rps']:>8} req/s  errors {result['errors']}", file=sys.stderr)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "latency_ms": args.latency_ms,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "posts": args.posts,
+        },
+        "scenarios": results,
+    }
+
+
+def compare(report, baseline, fail_over):
+    """Print p50/p95/throughput deltas against a baseline run; return the scenarios that regressed."""
+    regressions = []
+    print(f"{'scenario':<24} {'p50 ms':>10} {'Δ':>8} {'p95 ms':>10} {'Δ':>8} {'req/s':>10} {'Δ':>8}")
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            print(f"{name:<24} {'(no baseline)':>10}")
+            continue
+
+        def delta(new_value, old_value):
+            if not new_value or not old_value:
+                return None
+            return (new_value - old_value) / old_value * 100
+
+        p50 = delta(result["latency_ms"]["p50"], old["latency_ms"]["p50"])
+        p95 = delta(result["latency_ms"]["p95"], old["latency_ms"]["p95"])
+        rps = delta(result["throughput_rps"], old["throughput_rps"])
+        fmt = lambda value: "-" if value is None else f"{value:+.1f}%"
+        print(f"{name:<24} {result['latency_ms']['p50']:>10} {fmt(p50):>8} "
+              f"{result['latency_ms']['p95']:>10} {fmt(p95):>8} {result['throughput_rps']:>10} {fmt(rps):>8}")
+        if fail_over is not None and p95 is not None and p95 > fail_over:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark routes against the in-memory backend.")
+    arg_parser.add_argument("--requests", type=int, default=200, help="requests per scenario under load")
+    arg_parser.add_argument("--concurrency", type=int, default=4, help="concurrent clients")
+    arg_parser.add_argument("--latency-ms", type=float, default=20, help="simulated round trip per query/storage call")
+    arg_parser.add_argument("--posts", type=int, default=200, help="bulletin and news rows to seed")
+    arg_parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests before each scenario")
+    arg_parser.add_argument("--alloc-samples", type=int, default=10, help="sequential requests traced for allocations")
+    arg_parser.add_argument("--scenarios", nargs="*", help="subset of scenarios to run (default: all)")
+    arg_parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    arg_parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    arg_parser.add_argument("--fail-over", type=float, help="exit 1 if any p95 regresses by more than this percent")
+    args = arg_parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressed = compare(report, json.load(f), args.fail_over)
+        if regressed:
+            print(f"p95 regressed by more than {args.fail_over}% in: {', '.join(regressed)}", file=sys.stderr)
+            sys.exit(1)
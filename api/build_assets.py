@@ -0,0 +1,187 @@
+"""
+Static asset build step.
+
+Minifies the SVG and CSS files in api/static, writes content-hashed copies
+(plus .gz and .br variants) to api/static/dist and records the mapping in
+api/static/manifest.json, which asset_url() in main.py reads at runtime.
+Also precompiles the Jinja templates into api/jinja_cache, which main.py
+loads as a bytecode cache. Jinja only loads bytecode written by the same
+Python version, so run this with the deployment's Python.
+
+The outputs are committed, since the Vercel Python builder has no build
+hook to run this in. Re-run it and commit the results after changing
+anything in api/static or api/templates:
+
+    python api/build_assets.py [--precision 2]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+import brotli
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(STATIC_DIR, "manifest.json")
+TEMPLATES_DIR = os.path.join(os.path.dirname(STATIC_DIR), "templates")
+JINJA_CACHE_DIR = os.path.join(os.path.dirname(STATIC_DIR), "jinja_cache")
+# Filters registered in main.py. Jinja checks filter names at compile time but looks them up at render time.
+TEMPLATE_FILTERS = ("datetimeformat",)
+
+MINIFIABLE = {".svg", ".css"}
+COMPRESSIBLE = {".svg", ".css", ".js", ".html", ".json", ".txt"}
+FINGERPRINTED = MINIFIABLE | {".jpg", ".jpeg", ".png", ".webp", ".avif", ".gif", ".ico"}
+
+NUMBER_RE = re.compile(r"-?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?")
+NUMERIC_ATTR_RE = re.compile(r'(?<=\s)(d|points|transform|viewBox)="([^"]*)"')
+
+
+def format_number(match, precision):
+    value = round(float(match.group(0)), precision)
+    text = f"{value:.{precision}f}".rstrip("0").rstrip(".") if precision else str(int(value))
+    if text in ("-0", ""):
+        text = "0"
+    if text.startswith("0."):
+        text = text[1:]
+    elif text.startswith("-0."):
+        text = "-" + text[2:]
+    return text
+
+
+def minify_svg(text, precision=2):
+    text = re.sub(r"<\?xml[^>]*\?>", "", text)
+    text = re.sub(r"<!--.*?-->", "", text, flags=re.S)
+    text = re.sub(r"<metadata\b.*?</metadata>", "", text, flags=re.S)
+
+    def shorten(match):
+        values = NUMBER_RE.sub(lambda m: format_number(m, precision), match.group(2))
+        values = re.sub(r"\s+", " ", values).strip()
+        # Path commands don't need whitespace around them ("C 1 2" -> "C1 2").
+        values = re.sub(r"\s*([A-Za-z])\s*", r"\1", values) if match.group(1) == "d" else values
+        # A leading sign or decimal point already separates numbers ("1 -2 .5" -> "1-2.5").
+        values = re.sub(r" (?=[-.])", "", values) if match.group(1) in ("d", "points") else values
+        return f'{match.group(1)}="{values}"'
+
+    text = NUMERIC_ATTR_RE.sub(shorten, text)
+    text = re.sub(r">\s+<", "><", text)
+    text = re.sub(r"\s{2,}", " ", text)
+    return text.strip()
+
+
+def minify_css(text):
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    text = text.replace(";}", "}")
+    return text.strip()
+
+
+def render_asset(relpath, original, precision=2):
+    """The bytes that get fingerprinted and shipped for one source file."""
+    ext = os.path.splitext(relpath)[1].lower()
+    if ext == ".svg":
+        return minify_svg(original.decode("utf-8"), precision).encode("utf-8")
+    if ext == ".css":
+        return minify_css(original.decode("utf-8")).encode("utf-8")
+    return original
+
+
+def fingerprint(relpath, data):
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    stem, ext = os.path.splitext(relpath)
+    return f"{stem}.{digest}{ext}"
+
+
+def build(precision=2):
+    if os.path.isdir(DIST_DIR):
+        shutil.rmtree(DIST_DIR)
+    os.makedirs(DIST_DIR)
+
+    manifest = {}
+    report = []
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != DIST_DIR]
+        for name in sorted(files):
+            ext = os.path.splitext(name)[1].lower()
+            if ext not in FINGERPRINTED:
+                continue
+            src = os.path.join(root, name)
+            relpath = os.path.relpath(src, STATIC_DIR).replace(os.sep, "/")
+            with open(src, "rb") as f:
+                original = f.read()
+
+            data = render_asset(relpath, original, precision)
+            hashed = fingerprint(relpath, data)
+            out = os.path.join(DIST_DIR, hashed)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, "wb") as f:
+                f.write(data)
+
+            sizes = {"original": len(original), "minified": len(data)}
+            if ext in COMPRESSIBLE:
+                gz = gzip.compress(data, compresslevel=9, mtime=0)  # reproducible, so rebuilds only change what changed
+                with open(out + ".gz", "wb") as f:
+                    f.write(gz)
+                sizes["gzip"] = len(gz)
+                br = brotli.compress(data, quality=11)
+                with open(out + ".br", "wb") as f:
+                    f.write(br)
+                sizes["brotli"] = len(br)
+
+            manifest[relpath] = "dist/" + hashed
+            report.append((relpath, sizes))
+
+    with open(MANIFEST_PATH, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return report
+
+
+class NameKeyedBytecodeCache(FileSystemBytecodeCache):
+    # Must match TemplateBytecodeCache.get_cache_key in main.py: the runtime path differs from this one.
+    def get_cache_key(self, name, filename=None):
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()
+
+
+def compile_templates():
+    if os.path.isdir(JINJA_CACHE_DIR):
+        shutil.rmtree(JINJA_CACHE_DIR)
+    os.makedirs(JINJA_CACHE_DIR)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        bytecode_cache=NameKeyedBytecodeCache(JINJA_CACHE_DIR),
+        # Same rule as Flask's select_jinja_autoescape; it is baked into the compiled code.
+        autoescape=lambda name: name is not None and name.endswith((".html", ".htm", ".xml", ".xhtml", ".svg")),
+    )
+    env.filters.update({name: lambda value, *args, **kwargs: value for name in TEMPLATE_FILTERS})
+    names = env.list_templates()
+    for name in names:
+        env.get_template(name)
+    return names
+
+
+def print_report(report):
+    print(f"{'asset':<40} {'original':>10} {'minified':>10} {'gzip':>10} {'brotli':>10}")
+    totals = {"original": 0, "minified": 0}
+    for relpath, sizes in report:
+        totals["original"] += sizes["original"]
+        totals["minified"] += sizes["minified"]
+        print(
+            f"{relpath:<40} {sizes['original']:>10} {sizes['minified']:>10} "
+            f"{sizes.get('gzip', '-'):>10} {sizes.get('brotli', '-'):>10}"
+        )
+    print(f"{'total':<40} {totals['original']:>10} {totals['minified']:>10}")
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Minify, fingerprint and precompress static assets.")
+    arg_parser.add_argument("--precision", type=int, default=2, help="decimal places kept in SVG coordinates")
+    args = arg_parser.parse_args()
+    print_report(build(args.precision))
+    print(f"compiled {len(compile_templates())} templates into {JINJA_CACHE_DIR} for Python {sys.version.split()[0]}")
@@ -1,5 +1,10 @@
+import time
+
+STARTUP_STARTED = time.perf_counter()
+
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from jinja2 import FileSystemBytecodeCache
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, flash, jsonify, send_from_directory, abort, g
 from flask_login import (
     LoginManager,
     UserMixin,
@@ -9,17 +14,78 @@ from flask_login import (
     current_user,
 )
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
-from datetime import datetime
-import pytz
-from dateutil import parser
-from dotenv import load_dotenv
-from supabase import create_client, Client
-import time
+from datetime import datetime, timezone
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from functools import lru_cache, wraps
+from urllib.parse import urljoin
+import base64
+import contextvars
+import gzip
+import hashlib
+import hmac
+import heapq
+import importlib.util
+import io
+import itertools
+import json
+import math
+import mimetypes
+import queue
+import random
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
 import traceback
+import unicodedata
+import uuid
+from zoneinfo import ZoneInfo
+
+
+def lazy_import(name):
+    """Return a module that is only executed on first attribute access, keeping it off the cold-start path."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+parser = lazy_import("dateutil.parser")
+httpx = lazy_import("httpx")
+Image = lazy_import("PIL.Image")
+ImageOps = lazy_import("PIL.ImageOps")
+pil_features = lazy_import("PIL.features")
+
+# Cold-start report: perf_counter marks per initialisation phase, served in /admin/metrics
+startup_phases = OrderedDict()
+_startup_mark = STARTUP_STARTED
+
+
+def mark_startup(phase):
+    global _startup_mark
+    now = time.perf_counter()
+    startup_phases[phase] = now - _startup_mark
+    _startup_mark = now
+
+
+mark_startup("imports")
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (Vercel injects them; skip the file lookup there)
+if not os.getenv("VERCEL"):
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
@@ -27,50 +93,1274 @@ app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
 # Initialize Supabase client
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise Exception(
-        "SUPABASE_URL and SUPABASE_KEY must be set in your environment variables"
+
+# Data backend. "supabase" talks to the hosted project; "sqlite" and "memory" use
+# LocalClient below, which answers the same query-builder calls from SQLite and
+# keeps bucket objects on disk, so the whole app runs offline (load tests, profiling).
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase")  # supabase, sqlite or memory
+SQLITE_PATH = os.getenv("SQLITE_PATH", os.path.join(tempfile.gettempdir(), "e-looc.sqlite3"))
+LOCAL_STORAGE_DIR = os.getenv("LOCAL_STORAGE_DIR", os.path.join(tempfile.gettempdir(), "e-looc-storage"))
+LOCAL_STORAGE_URL = "/local-storage"
+LOCAL_SEED_PATH = os.getenv("LOCAL_SEED_PATH")  # optional JSON {table: [rows]} loaded into empty tables
+LOCAL_LATENCY_MS = float(os.getenv("LOCAL_LATENCY_MS", "0"))  # simulated round trip per query/storage call
+LOCAL_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+LOCAL_FILTER_OPS = {"eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+
+class LocalResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def local_column(name):
+    if not LOCAL_IDENTIFIER_RE.match(name):
+        raise ValueError(f"Invalid column name {name!r}")
+    return "id" if name == "id" else f"json_extract(data, '$.{name}')"
+
+
+def local_literal(text):
+    """Parse a value from PostgREST filter syntax (quoted string, number, true/false/null)."""
+    if len(text) >= 2 and text[0] == text[-1] == '"':
+        return text[1:-1]
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "null":
+        return None
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def split_top_level(text):
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, ch in enumerate(text):
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ",":
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+def local_logic_tree(expr, params):
+    """Translate a PostgREST logic tree such as `a.gt.1,and(b.eq."x",id.lt.5)` into SQL."""
+    expr = expr.strip()
+    for joiner in ("and", "or"):
+        if expr.startswith(f"{joiner}(") and expr.endswith(")"):
+            return local_logic_group(joiner, expr[len(joiner) + 1:-1], params)
+    column, op, value = expr.split(".", 2)
+    if op == "is":
+        return f"{local_column(column)} IS {'NOT NULL' if local_literal(value) is not None else 'NULL'}"
+    if op not in LOCAL_FILTER_OPS:
+        raise ValueError(f"Unsupported filter operator {op!r}")
+    params.append(local_literal(value))
+    return f"{local_column(column)} {LOCAL_FILTER_OPS[op]} ?"
+
+
+def local_logic_group(joiner, body, params):
+    clauses = [local_logic_tree(part, params) for part in split_top_level(body)]
+    return "(" + f" {joiner.upper()} ".join(clauses) + ")"
+
+
+class LocalQuery:
+    """The subset of postgrest's request builder this app uses, compiled to one SQLite statement."""
+
+    def __init__(self, client, table_name):
+        if not LOCAL_IDENTIFIER_RE.match(table_name):
+            raise ValueError(f"Invalid table name {table_name!r}")
+        self.client = client
+        self.table_name = table_name
+        self.columns = None  # None means every column
+        self.count_method = None
+        self.head = False
+        self.where = []
+        self.params = []
+        self.orders = []
+        self.limit_count = None
+        self.offset = 0
+        self.single_row = None  # None, "single" or "maybe"
+        self.operation = "select"
+        self.payload = None
+        self.on_conflict = ""
+        self.ignore_duplicates = False
+
+    def select(self, *columns, count=None, head=None):
+        names = [c.strip() for column in columns for c in column.split(",") if c.strip()]
+        self.columns = None if not names or "*" in names else names
+        self.count_method = count
+        self.head = bool(head)
+        return self
+
+    def _filter(self, column, op, value):
+        self.where.append(f"{local_column(column)} {op} ?")
+        self.params.append(value)
+        return self
+
+    def eq(self, column, value):
+        if value is None:
+            self.where.append(f"{local_column(column)} IS NULL")
+            return self
+        return self._filter(column, "=", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "!=", value)
+
+    def gt(self, column, value):
+        return self._filter(column, ">", value)
+
+    def gte(self, column, value):
+        return self._filter(column, ">=", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "<", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "<=", value)
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self.where.append("0")
+            return self
+        self.where.append(f"{local_column(column)} IN ({', '.join('?' * len(values))})")
+        self.params.extend(values)
+        return self
+
+    def or_(self, filters):
+        self.where.append(local_logic_group("or", filters, self.params))
+        return self
+
+    def order(self, column, desc=False, nullsfirst=None):
+        # Postgres puts NULLs last ascending and first descending unless told otherwise.
+        nulls_first = desc if nullsfirst is None else nullsfirst
+        expr = local_column(column)
+        self.orders.append(f"({expr} IS NULL) {'DESC' if nulls_first else 'ASC'}, {expr} {'DESC' if desc else 'ASC'}")
+        return self
+
+    def limit(self, size):
+        self.limit_count = size
+        return self
+
+    def range(self, start, end):
+        self.offset = start
+        self.limit_count = end - start + 1
+        return self
+
+    def single(self):
+        self.single_row = "single"
+        return self
+
+    def maybe_single(self):
+        self.single_row = "maybe"
+        return self
+
+    def insert(self, json, **kwargs):
+        self.operation = "insert"
+        self.payload = json
+        return self
+
+    def upsert(self, json, on_conflict="", ignore_duplicates=False, **kwargs):
+        self.operation = "upsert"
+        self.payload = json
+        self.on_conflict = on_conflict
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json, **kwargs):
+        self.operation = "update"
+        self.payload = json
+        return self
+
+    def delete(self, **kwargs):
+        self.operation = "delete"
+        return self
+
+    def execute(self):
+        return self.client.execute(self)
+
+    def where_sql(self):
+        return f" WHERE {' AND '.join(self.where)}" if self.where else ""
+
+
+def simulate_round_trip(latency):
+    if latency > 0:
+        # +/-20% jitter, so concurrent requests don't move in lockstep.
+        time.sleep(latency * random.uniform(0.8, 1.2))
+
+
+class LocalBucket:
+    """Stand-in for a storage bucket: objects are files under LOCAL_STORAGE_DIR/<bucket>/."""
+
+    def __init__(self, storage, bucket_name):
+        self.storage = storage
+        self.bucket_name = bucket_name
+        self.root = os.path.join(storage.root, bucket_name)
+
+    def _path(self, path):
+        full = os.path.abspath(os.path.join(self.root, path))
+        if not full.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Invalid object path {path!r}")
+        return full
+
+    def upload(self, path, file, file_options=None):
+        simulate_round_trip(self.storage.latency)
+        full = self._path(path)
+        if os.path.exists(full) and str((file_options or {}).get("upsert", "false")).lower() != "true":
+            raise Exception(f"The resource already exists: {self.bucket_name}/{path}")
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        with open(full, "wb") as f:
+            if hasattr(file, "read"):
+                shutil.copyfileobj(file, f)
+            else:
+                f.write(file)
+        return {"Key": f"{self.bucket_name}/{path}"}
+
+    def get_public_url(self, path):
+        return f"{LOCAL_STORAGE_URL}/{self.bucket_name}/{path}"
+
+    def remove(self, paths):
+        simulate_round_trip(self.storage.latency)
+        removed = []
+        for path in paths:
+            try:
+                os.remove(self._path(path))
+                removed.append({"name": path})
+            except FileNotFoundError:
+                pass  # Supabase silently skips missing objects too
+        return removed
+
+    def exists(self, path):
+        simulate_round_trip(self.storage.latency)
+        return os.path.isfile(self._path(path))
+
+    def list(self, path="", options=None):
+        simulate_round_trip(self.storage.latency)
+        options = options or {}
+        folder = self._path(path) if path else self.root
+        search = (options.get("search") or "").lower()
+        items = []
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                if search not in name.lower():
+                    continue
+                full = os.path.join(folder, name)
+                if os.path.isdir(full):
+                    items.append({"name": name, "id": None})
+                    continue
+                stat = os.stat(full)
+                modified = datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()
+                items.append({
+                    "name": name,
+                    "id": hashlib.md5(full.encode()).hexdigest(),
+                    "created_at": modified,
+                    "updated_at": modified,
+                    "metadata": {"size": stat.st_size, "mimetype": mimetypes.guess_type(name)[0]},
+                })
+        sort_by = options.get("sortBy") or {"column": "name", "order": "asc"}
+        items.sort(key=lambda item: item.get(sort_by["column"]) or "", reverse=sort_by.get("order") == "desc")
+        offset = options.get("offset", 0)
+        return items[offset:offset + options.get("limit", 100)]
+
+
+class LocalStorage:
+    def __init__(self, root, latency=0.0):
+        self.root = root
+        self.latency = latency
+
+    def from_(self, bucket_name):
+        return LocalBucket(self, bucket_name)
+
+
+class LocalClient:
+    """
+    Offline replacement for the Supabase client. Each table is a SQLite table
+    of (id, JSON document), created on first use, so filters, ordering,
+    ranges, counts and single-row reads behave like PostgREST without a
+    schema to keep in sync. Writes return the affected rows, as Supabase
+    does with return=representation.
+    """
+
+    def __init__(self, path, storage_root, latency=0.0):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        self._tables = set()
+        self.latency = latency  # seconds
+        self.storage = LocalStorage(storage_root, latency)
+        self.listeners = []  # called with the table name after every write
+
+    def table(self, table_name):
+        return LocalQuery(self, table_name)
+
+    from_ = table
+
+    def _ensure_table(self, table_name):
+        if table_name not in self._tables:
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table_name}" (id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)'
+            )
+            self._tables.add(table_name)
+
+    @staticmethod
+    def _row(row_id, data, columns=None):
+        row = {"id": row_id, **json.loads(data)}
+        return row if columns is None else {column: row.get(column) for column in columns}
+
+    def execute(self, query):
+        simulate_round_trip(self.latency)  # outside the lock, like concurrent HTTP calls
+        with self._lock:
+            self._ensure_table(query.table_name)
+            if query.operation == "select":
+                response = self._select(query)
+            else:
+                response = self._write(query)
+        if query.operation != "select":
+            for listener in self.listeners:
+                listener(query.table_name)
+        return response
+
+    def _select(self, query):
+        table = f'"{query.table_name}"'
+        count = None
+        if query.count_method:
+            count = self._conn.execute(f"SELECT COUNT(*) FROM {table}{query.where_sql()}", query.params).fetchone()[0]
+        if query.head:
+            return LocalResponse([], count)
+        sql = f"SELECT id, data FROM {table}{query.where_sql()}"
+        if query.orders:
+            sql += " ORDER BY " + ", ".join(query.orders)
+        if query.limit_count is not None or query.offset:
+            sql += f" LIMIT {int(query.limit_count if query.limit_count is not None else -1)} OFFSET {int(query.offset)}"
+        rows = [self._row(row_id, data, query.columns) for row_id, data in self._conn.execute(sql, query.params)]
+        if query.single_row:
+            if len(rows) == 1:
+                return LocalResponse(rows[0], count)
+            if not rows and query.single_row == "maybe":
+                return LocalResponse(None, count)
+            from postgrest.exceptions import APIError
+
+            raise APIError({
+                "code": "PGRST116",
+                "message": "JSON object requested, multiple (or no) rows returned",
+                "details": f"The result contains {len(rows)} rows",
+                "hint": None,
+            })
+        return LocalResponse(rows, count)
+
+    def _write(self, query):
+        table = f'"{query.table_name}"'
+        if query.operation in ("insert", "upsert"):
+            items = query.payload if isinstance(query.payload, list) else [query.payload]
+            rows = []
+            for item in items:
+                item = dict(item)
+                row_id = item.pop("id", None)
+                if query.operation == "upsert" and query.on_conflict not in ("", "id"):
+                    conflict_columns = [column.strip() for column in query.on_conflict.split(",")]
+                    match = self._conn.execute(
+                        f"SELECT id FROM {table} WHERE " + " AND ".join(f"{local_column(c)} = ?" for c in conflict_columns),
+                        [item.get(column) for column in conflict_columns],
+                    ).fetchone()
+                    if match and query.ignore_duplicates:
+                        continue  # PostgREST leaves the existing row alone and doesn't return it
+                    row_id = match[0] if match else row_id
+                if query.operation == "upsert" and row_id is not None:
+                    existing = self._conn.execute(f"SELECT data FROM {table} WHERE id = ?", (row_id,)).fetchone()
+                    if existing:
+                        item = {**json.loads(existing[0]), **item}
+                cursor = self._conn.execute(
+                    f"INSERT OR REPLACE INTO {table} (id, data) VALUES (?, ?)", (row_id, json.dumps(item, default=str))
+                )
+                rows.append({"id": cursor.lastrowid if row_id is None else row_id, **item})
+            return LocalResponse(rows)
+
+        matched = self._conn.execute(f"SELECT id, data FROM {table}{query.where_sql()}", query.params).fetchall()
+        rows = [self._row(row_id, data) for row_id, data in matched]
+        if query.operation == "delete":
+            self._conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row["id"],) for row in rows])
+            return LocalResponse(rows)
+        changes = {key: value for key, value in query.payload.items() if key != "id"}
+        for row in rows:
+            row.update(changes)
+        self._conn.executemany(
+            f"UPDATE {table} SET data = ? WHERE id = ?",
+            [(json.dumps({k: v for k, v in row.items() if k != "id"}, default=str), row["id"]) for row in rows],
+        )
+        return LocalResponse(rows)
+
+    def seed(self, rows_by_table):
+        """Insert fixture rows into tables that are still empty."""
+        for table_name, rows in rows_by_table.items():
+            if rows and not self.table(table_name).select("id", count="exact", head=True).execute().count:
+                self.table(table_name).insert(rows).execute()
+
+
+class LazyClient:
+    """
+    Builds the Supabase client on first use. Importing supabase pulls in
+    gotrue, postgrest, storage3, realtime and httpx, which is most of a cold
+    start, and many requests (cached pages, static assets) never need it.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+def connect_supabase():
+    from postgrest import SyncPostgrestClient
+    from postgrest.utils import SyncClient as PostgrestSession
+    from storage3 import SyncStorageClient
+    from storage3.utils import SyncClient as StorageSession
+    from supabase import ClientOptions, create_client
+
+    # The REST and storage clients normally build one httpx pool (and TLS context) each;
+    # these subclasses hand both the shared pool instead.
+    class PooledPostgrestClient(SyncPostgrestClient):
+        def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+            return PostgrestSession(
+                base_url=base_url, headers=headers, timeout=timeout, transport=shared_http_transport(), follow_redirects=True
+            )
+
+    class PooledStorageClient(SyncStorageClient):
+        def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+            return StorageSession(
+                base_url=base_url, headers=headers, timeout=timeout, transport=shared_http_transport(), follow_redirects=True
+            )
+
+    started = time.perf_counter()
+    options = ClientOptions(
+        postgrest_client_timeout=httpx.Timeout(SUPABASE_TIMEOUT, connect=SUPABASE_CONNECT_TIMEOUT),
+        storage_client_timeout=STORAGE_TIMEOUT,
+    )
+    client = create_client(SUPABASE_URL, SUPABASE_KEY, options=options)
+    client._init_postgrest_client = lambda rest_url, headers, schema, timeout, verify=True, proxy=None: (
+        PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout, verify=verify, proxy=proxy)
+    )
+    client._init_storage_client = lambda storage_url, headers, storage_client_timeout, verify=True, proxy=None: (
+        PooledStorageClient(storage_url, headers, storage_client_timeout, verify, proxy)
+    )
+    app.logger.info(f"Supabase client ready in {(time.perf_counter() - started) * 1000:.0f}ms")
+    return client
+
+
+def create_data_client():
+    if DATA_BACKEND == "supabase":
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            raise Exception(
+                "SUPABASE_URL and SUPABASE_KEY must be set in your environment variables"
+            )
+        return LazyClient(connect_supabase)
+    if DATA_BACKEND not in ("sqlite", "memory"):
+        raise Exception(f"Unknown DATA_BACKEND {DATA_BACKEND!r}; expected supabase, sqlite or memory")
+    client = LocalClient(
+        ":memory:" if DATA_BACKEND == "memory" else SQLITE_PATH, LOCAL_STORAGE_DIR, LOCAL_LATENCY_MS / 1000
+    )
+    if LOCAL_SEED_PATH:
+        with open(LOCAL_SEED_PATH) as f:
+            client.seed(json.load(f))
+    app.logger.info(f"Using the local {DATA_BACKEND} data backend")
+    return client
+
+
+data_client = create_data_client()
+
+
+def serve_local_storage_object(bucket_name, filename):
+    return send_from_directory(os.path.join(LOCAL_STORAGE_DIR, bucket_name), filename)
+
+
+if DATA_BACKEND != "supabase":
+    app.add_url_rule(f"{LOCAL_STORAGE_URL}/<bucket_name>/<path:filename>", view_func=serve_local_storage_object)
+
+# Request timing: where each request spends its time (queries, storage, templates,
+# password hashing), reported as Server-Timing, Prometheus histograms and a slow-request log
+SERVER_TIMING = os.getenv("SERVER_TIMING", "admin")  # "all", "admin" (signed-in users only) or "off"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))  # 0 disables the slow-request log
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")  # lets a Prometheus scraper authenticate with a bearer token
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, label_names, buckets=METRICS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: list(values) for labels, values in self._series.items()}
+        for labels, values in sorted(series.items()):
+            label_text = ",".join(f'{name}="{prometheus_escape(value)}"' for name, value in zip(self.label_names, labels))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {values[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {values[-1]}")
+        return "\n".join(lines)
+
+
+def prometheus_escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_histogram = Histogram(
+    "elooc_request_duration_seconds", "Request latency by route.", ("route", "method", "status")
+)
+operation_histogram = Histogram(
+    "elooc_operation_duration_seconds", "Time spent in backend calls and rendering.", ("operation", "target")
+)
+
+
+class RequestTimings:
+    """Operations recorded during one request; shared with worker threads via the context."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.operations = []  # (operation, target, start offset, seconds)
+        self._lock = threading.Lock()
+
+    def add(self, operation, target, started, seconds):
+        with self._lock:
+            self.operations.append((operation, target, started - self.started, seconds))
+
+    def totals(self):
+        totals = OrderedDict()
+        with self._lock:
+            for operation, _, _, seconds in self.operations:
+                total, count = totals.get(operation, (0.0, 0))
+                totals[operation] = (total + seconds, count + 1)
+        return totals
+
+
+current_timings = contextvars.ContextVar("current_timings", default=None)
+
+
+@contextmanager
+def timed(operation, target=""):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        operation_histogram.observe((operation, target), seconds)
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add(operation, target, started, seconds)
+
+
+# Resilient transport: one pooled HTTP/2 connection set to Supabase, bounded retries for
+# idempotent reads and a circuit breaker so an outage fails fast instead of tying up workers
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", "3"))
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv("SUPABASE_CONNECT_TIMEOUT", "2"))
+STORAGE_TIMEOUT = float(os.getenv("STORAGE_TIMEOUT", "20"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+READ_RETRIES = int(os.getenv("READ_RETRIES", "2"))
+READ_DEADLINE = float(os.getenv("READ_DEADLINE", "4.5"))  # under QUERY_TIMEOUT, so a batch sees the real error
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "0.1"))
+RETRY_BACKOFF_CAP = 1.0
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+# PostgREST could not reach or is still loading the database
+TRANSIENT_POSTGREST_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}
+READ_OPERATIONS = {"select": True, "insert": False, "update": False, "upsert": False, "delete": False}
+STORAGE_READ_OPERATIONS = {"list", "download", "info", "exists"}
+
+
+@lru_cache(maxsize=None)
+def shared_http_transport():
+    """The keep-alive HTTP/2 connection pool shared by the REST, storage and resumable upload clients."""
+    return httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=HTTP_POOL_SIZE,
+            max_keepalive_connections=HTTP_POOL_SIZE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        retries=1,  # connection attempts only: nothing has been sent yet, so this is safe for writes too
     )
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+def is_transient_error(error):
+    """True for failures worth retrying: timeouts, dropped connections and 5xx responses."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    if code in TRANSIENT_POSTGREST_CODES:
+        return True
+    status = code if isinstance(code, int) else getattr(error, "status", None)
+    if isinstance(status, int):
+        return status >= 500
+    if isinstance(error, sqlite3.OperationalError):
+        return "locked" in str(error)
+    return isinstance(error, httpx.TransportError)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed: calls pass through and consecutive transient failures are counted.
+    Open (after `threshold` of them): calls fail at once for `reset_timeout`
+    seconds. Half-open: a single probe is let through; its outcome closes the
+    breaker or opens it again.
+    """
+
+    STATES = ("closed", "half_open", "open")
+
+    def __init__(self, name, threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "open" or (self.state == "half_open" and self._probing):
+                self.rejected += 1
+                raise CircuitOpenError(f"{self.name} circuit breaker is open")
+            if self.state == "half_open":
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            if self.state != "closed":
+                app.logger.info(f"{self.name} circuit breaker closed")
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or self.failures >= self.threshold:
+                if self.state != "open":
+                    self.times_opened += 1
+                    app.logger.warning(f"{self.name} circuit breaker opened after {self.failures} failure(s)")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+class ResilientTransport:
+    """
+    Runs backend calls behind a circuit breaker. Transient failures of
+    idempotent calls are retried with jittered exponential backoff until
+    `retries` or the `deadline` runs out; writes are never retried.
+    """
+
+    def __init__(self, name, retries=READ_RETRIES, deadline=READ_DEADLINE):
+        self.name = name
+        self.retries = retries
+        self.deadline = deadline
+        self.breaker = CircuitBreaker(name)
+        self.calls = 0
+        self.retried = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def call(self, fn, idempotent=False):
+        with self._lock:
+            self.calls += 1
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                if not is_transient_error(e):
+                    self.breaker.record_success()  # the backend answered; the request itself was bad
+                    raise
+                self.breaker.record_failure()
+                delay = random.uniform(0, min(RETRY_BACKOFF_CAP, RETRY_BACKOFF * 2 ** attempt))
+                if not idempotent or attempt >= self.retries or time.monotonic() - started + delay >= self.deadline:
+                    with self._lock:
+                        self.failed += 1
+                    raise
+                attempt += 1
+                with self._lock:
+                    self.retried += 1
+                app.logger.warning(f"{self.name} call failed ({type(e).__name__}), retry {attempt} in {delay * 1000:.0f}ms")
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self):
+        with self._lock:
+            counts = {"calls": self.calls, "retries": self.retried, "failures": self.failed}
+        return {**counts, "breaker": self.breaker.stats()}
+
+
+db_transport = ResilientTransport("db")
+storage_transport = ResilientTransport("storage")
+
+
+def transport_metrics():
+    lines = [
+        "# HELP elooc_circuit_breaker_state Breaker state per backend: 0 closed, 1 half-open, 2 open.",
+        "# TYPE elooc_circuit_breaker_state gauge",
+    ]
+    transports = (db_transport, storage_transport)
+    for transport in transports:
+        lines.append(f'elooc_circuit_breaker_state{{backend="{transport.name}"}} {CircuitBreaker.STATES.index(transport.breaker.state)}')
+    for metric, help_text, value in (
+        ("retries", "Retried backend calls.", lambda t: t.retried),
+        ("failures", "Backend calls that failed after retries.", lambda t: t.failed),
+        ("rejected", "Calls rejected by an open circuit breaker.", lambda t: t.breaker.rejected),
+    ):
+        lines += [f"# HELP elooc_backend_{metric}_total {help_text}", f"# TYPE elooc_backend_{metric}_total counter"]
+        lines += [f'elooc_backend_{metric}_total{{backend="{t.name}"}} {value(t)}' for t in transports]
+    return "\n".join(lines)
+
+
+class InstrumentedQuery:
+    """
+    Wraps a query builder so execute() is timed and goes through the resilient
+    transport; every other call passes through. Queries started with select()
+    are reads and may be retried.
+    """
+
+    def __init__(self, builder, table_name, read=False):
+        self._builder = builder
+        self._table_name = table_name
+        self._read = read
+
+    def execute(self):
+        with timed("db", self._table_name):
+            return db_transport.call(self._builder.execute, idempotent=self._read)
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+        read = READ_OPERATIONS.get(name, self._read)
+
+        @wraps(attr)
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            return InstrumentedQuery(result, self._table_name, read) if hasattr(result, "execute") else result
+        return chained
+
+
+class InstrumentedBucket:
+    def __init__(self, bucket, bucket_name):
+        self._bucket = bucket
+        self._bucket_name = bucket_name
+
+    def __getattr__(self, name):
+        attr = getattr(self._bucket, name)
+        if not callable(attr) or name == "get_public_url":  # computed locally, no round trip
+            return attr
+
+        @wraps(attr)
+        def call(*args, **kwargs):
+            with timed(f"storage_{name}", self._bucket_name):
+                return storage_transport.call(lambda: attr(*args, **kwargs), idempotent=name in STORAGE_READ_OPERATIONS)
+        return call
+
+
+class InstrumentedStorage:
+    def __init__(self, storage):
+        self._storage = storage
+
+    def from_(self, bucket_name):
+        return InstrumentedBucket(self._storage.from_(bucket_name), bucket_name)
+
+    def __getattr__(self, name):
+        return getattr(self._storage, name)
+
+
+class InstrumentedClient:
+    """Times every query and storage call made through the data client."""
+
+    def __init__(self, client):
+        self._client = client
+        self._storage = None
+
+    @property
+    def storage(self):
+        if self._storage is None:
+            self._storage = InstrumentedStorage(self._client.storage)
+        return self._storage
+
+    def table(self, table_name):
+        return InstrumentedQuery(self._client.table(table_name), table_name)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+supabase = InstrumentedClient(data_client)
+mark_startup("data client")
+
+# Shadows Flask's render_template so every view's rendering is timed.
+flask_render_template = render_template
+
+
+def render_template(template_name_or_list, **context):
+    with timed("render", template_name_or_list if isinstance(template_name_or_list, str) else "template"):
+        return flask_render_template(template_name_or_list, **context)
+
+
+@app.before_request
+def start_request_timings():
+    current_timings.set(RequestTimings())
+
+
+@app.after_request
+def record_request_timings(response):
+    timings = current_timings.get()
+    if timings is None:
+        return response
+    elapsed = time.perf_counter() - timings.started
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    request_histogram.observe((route, request.method, str(response.status_code)), elapsed)
+
+    if SERVER_TIMING == "all" or (SERVER_TIMING == "admin" and current_user.is_authenticated):
+        entries = [
+            f'{operation};dur={seconds * 1000:.1f};desc="{count} call{"s" if count != 1 else ""}"'
+            for operation, (seconds, count) in timings.totals().items()
+        ]
+        entries.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(entries)
+
+    if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+        breakdown = "; ".join(
+            f"+{offset * 1000:.0f}ms {operation}({target}) {seconds * 1000:.1f}ms"
+            for operation, target, offset, seconds in timings.operations
+        )
+        app.logger.warning(
+            f"Slow request {request.method} {request.full_path.rstrip('?')} -> {response.status_code} "
+            f"in {elapsed * 1000:.0f}ms: {breakdown or 'no backend calls'}"
+        )
+    return response
 
 # Flask-Login setup
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = "admin_login"
 
-# In app.py, modify get_manila_time() function
+MANILA_TZ = ZoneInfo("Asia/Manila")
+DISPLAY_DATETIME_FORMAT = "%B %d, %Y %I:%M %p"
+TIMESTAMP_CACHE_SIZE = int(os.getenv("TIMESTAMP_CACHE_SIZE", "4096"))
+
+
 def get_manila_time():
-    manila_tz = pytz.timezone("Asia/Manila")
-    return datetime.now(manila_tz)
+    return datetime.now(MANILA_TZ)
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def parse_timestamp(value):
+    """
+    Parse an ISO-8601 string into an aware datetime in Manila time. Naive
+    values are taken to already be Manila time. The same date_posted values
+    are rendered over and over, so results are memoized.
+    """
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        dt = parser.isoparse(value)  # forms fromisoformat rejects on older Pythons
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=MANILA_TZ)
+    return dt.astimezone(MANILA_TZ)
+
+
+@lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)
+def format_timestamp(value, format=DISPLAY_DATETIME_FORMAT):
+    return parse_timestamp(value).strftime(format)
+
+
+class PostView:
+    """
+    Render model for a bulletin or news row. date_posted is parsed, moved to
+    Manila time and formatted once when the row is fetched, so templates only
+    read attributes.
+    """
+
+    __slots__ = (
+        "id", "title", "content", "image_url", "image_variants", "is_active", "created_by",
+        "date_posted", "posted_at", "date_display",
+    )
+    ROW_FIELDS = __slots__[:-2]
+
+    def __init__(self, row):
+        for name in self.ROW_FIELDS:
+            setattr(self, name, row.get(name))
+        self.posted_at = parse_timestamp(self.date_posted) if self.date_posted else None
+        self.date_display = format_timestamp(self.date_posted) if self.date_posted else ""
+
+    @classmethod
+    def from_rows(cls, rows):
+        return [cls(row) for row in rows]
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.ROW_FIELDS}
+
+    def __repr__(self):
+        return f"<PostView {self.id} {self.title!r}>"
+
+# Upload limits. Bodies above UPLOAD_SPOOL_THRESHOLD go straight to a temp file,
+# and anything above RESUMABLE_UPLOAD_THRESHOLD is sent to storage in chunks.
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", str(10 * 1024 * 1024)))
+UPLOAD_SPOOL_THRESHOLD = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", str(512 * 1024)))
+RESUMABLE_UPLOAD_THRESHOLD = int(os.getenv("RESUMABLE_UPLOAD_THRESHOLD", str(6 * 1024 * 1024)))
+RESUMABLE_CHUNK_SIZE = 6 * 1024 * 1024  # Supabase's resumable endpoint requires 6 MB chunks
+RESUMABLE_MAX_RETRIES = 3
+ALLOWED_UPLOAD_TYPES = set(os.getenv("ALLOWED_UPLOAD_TYPES", "image/jpeg,image/png,image/webp").split(","))
+UPLOAD_SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/webp": (b"RIFF",),
+    "image/gif": (b"GIF87a", b"GIF89a"),
+}
+# Extension for the stored object, from the type validate_upload checked (never the client's filename).
+UPLOAD_EXTENSIONS = {"image/jpeg": ".jpg", "image/png": ".png", "image/webp": ".webp", "image/gif": ".gif"}
+
+# Reject oversized requests before the body is read (form fields get 1 MB of headroom).
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_SIZE + 1024 * 1024
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Large bodies skip the in-memory buffer entirely; unknown lengths spool over the threshold.
+        if total_content_length is not None and total_content_length > UPLOAD_SPOOL_THRESHOLD:
+            return tempfile.TemporaryFile("rb+")
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_THRESHOLD, mode="rb+")
+
+
+app.request_class = UploadRequest
+
+
+def get_upload_size(file):
+    stream = file.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
+
+
+def validate_upload(file):
+    """Return an error message if the upload is too large or not an allowed type, else None."""
+    if file.mimetype not in ALLOWED_UPLOAD_TYPES:
+        return f"Unsupported file type '{file.mimetype}'. Allowed: {', '.join(sorted(ALLOWED_UPLOAD_TYPES))}."
+    if get_upload_size(file) > MAX_UPLOAD_SIZE:
+        return f"File is too large. The maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)} MB."
+    head = file.stream.read(16)
+    file.stream.seek(0)
+    if not head.startswith(UPLOAD_SIGNATURES.get(file.mimetype, (b"",))):
+        return "The uploaded file's contents don't match its type."
+    return None
+
+
+def get_upload_body(stream):
+    # storage3 streams FileIO objects in chunks; only small, in-memory uploads are passed as bytes.
+    stream.seek(0)
+    buffered = getattr(stream, "_file", stream)  # unwrap SpooledTemporaryFile
+    raw = getattr(buffered, "raw", None)
+    if isinstance(raw, io.FileIO):
+        buffered.seek(0)
+        return raw
+    return stream.read()
+
+
+def resumable_upload_to_supabase_storage(stream, size, filename, content_type, bucket_name):
+    """
+    Upload a large file with Supabase's TUS resumable endpoint, one chunk at a
+    time. A failed chunk is retried from the offset the server reports, so
+    only that chunk is resent.
+    """
+    endpoint = f"{SUPABASE_URL}/storage/v1/upload/resumable"
+    headers = {"Authorization": f"Bearer {SUPABASE_KEY}", "apikey": SUPABASE_KEY, "Tus-Resumable": "1.0.0"}
+    metadata = ",".join(
+        f"{key} {base64.b64encode(value.encode()).decode()}"
+        for key, value in {"bucketName": bucket_name, "objectName": filename, "contentType": content_type}.items()
+    )
+
+    client = httpx.Client(timeout=60, transport=shared_http_transport())  # not closed: that would close the shared pool
+    with timed("storage_resumable_upload", bucket_name):
+        resp = client.post(endpoint, headers={
+            **headers, "Upload-Length": str(size), "Upload-Metadata": metadata, "x-upsert": "true"
+        })
+        resp.raise_for_status()
+        location = str(httpx.URL(endpoint).join(resp.headers["Location"]))
+
+        offset = 0
+        failures = 0
+        while offset < size:
+            stream.seek(offset)
+            chunk = stream.read(RESUMABLE_CHUNK_SIZE)
+            try:
+                resp = client.patch(location, content=chunk, headers={
+                    **headers,
+                    "Upload-Offset": str(offset),
+                    "Content-Type": "application/offset+octet-stream",
+                })
+                resp.raise_for_status()
+                offset = int(resp.headers["Upload-Offset"])
+                failures = 0
+            except httpx.HTTPError as e:
+                failures += 1
+                if failures > RESUMABLE_MAX_RETRIES:
+                    raise
+                app.logger.warning(f"Chunk at offset {offset} of {filename} failed ({type(e).__name__}), resuming")
+                time.sleep(0.5 * 2 ** failures)
+                head = client.head(location, headers=headers)
+                head.raise_for_status()
+                offset = int(head.headers["Upload-Offset"])
+
+    public_url = supabase.storage.from_(bucket_name).get_public_url(filename)
+    app.logger.info(f"Successfully uploaded {filename} ({size} bytes, resumable) to {bucket_name}. Public URL: {public_url}")
+    return public_url
+
+
+# Content-addressed post images: objects are named after the SHA-256 of the uploaded file, in
+# one bucket shared by bulletins and news, so the same file is stored (and uploaded) only once
+IMAGE_CONTENT_BUCKET = os.getenv("IMAGE_CONTENT_BUCKET", "post-images")
+content_store_counts = {"uploaded": 0, "deduplicated": 0, "released": 0, "failed": 0}
+content_store_lock = threading.Lock()
+CONTENT_OBJECT_RE = re.compile(r"^([0-9a-f]{64})(?:_(\d+)w)?\.(\w+)$")  # <digest>.<ext> or <digest>_<width>w.<fmt>
+
+
+def count_content_store(name, amount=1):
+    with content_store_lock:
+        content_store_counts[name] += amount
+
+
+def content_store_stats():
+    with content_store_lock:
+        return dict(content_store_counts)
+
+
+def hash_upload(stream):
+    digest = hashlib.sha256()
+    stream.seek(0)
+    for chunk in iter(lambda: stream.read(1024 * 1024), b""):
+        digest.update(chunk)
+    stream.seek(0)
+    return digest.hexdigest()
+
+
+def find_content_objects(digest, bucket_name):
+    """
+    The stored objects for one digest as {"main": name, "variants": {fmt: [(width, name), ...]}},
+    or None when the main object is missing. One list call answers for the file and all its variants.
+    """
+    found = {"main": None, "variants": {}}
+    for item in supabase.storage.from_(bucket_name).list("", {"search": digest, "limit": 100}) or []:
+        match = CONTENT_OBJECT_RE.match(item.get("name") or "")
+        if not match or match.group(1) != digest:
+            continue
+        if match.group(2):
+            found["variants"].setdefault(match.group(3), []).append((int(match.group(2)), item["name"]))
+        else:
+            found["main"] = item["name"]
+    return found if found["main"] else None
+
 
 # Helper function to upload image to Supabase Storage
-def upload_to_supabase_storage(file, bucket_name):
+def upload_to_supabase_storage(file, bucket_name=IMAGE_CONTENT_BUCKET):
     if not file or not file.filename:
         app.logger.info("upload_to_supabase_storage: No file or filename provided.")
         return None
 
     try:
-        # Corrected f-string:
-        filename = f"{int(time.time())}_{secure_filename(file.filename)}"
+        digest = hash_upload(file.stream)
+        existing = find_content_objects(digest, bucket_name)
+        if existing:
+            count_content_store("deduplicated")
+            app.logger.info(f"{file.filename} is already stored as {existing['main']} in {bucket_name}; not uploading it again")
+            return supabase.storage.from_(bucket_name).get_public_url(existing["main"])
+        filename = digest + UPLOAD_EXTENSIONS.get(file.mimetype, "")
+        size = get_upload_size(file)
+        if size > RESUMABLE_UPLOAD_THRESHOLD and DATA_BACKEND == "supabase":
+            public_url = resumable_upload_to_supabase_storage(file.stream, size, filename, file.content_type, bucket_name)
+        else:
+            public_url = upload_bytes_to_supabase_storage(get_upload_body(file.stream), filename, file.content_type, bucket_name)
+        count_content_store("uploaded")
+        return public_url
+    except Exception as e:
+        count_content_store("failed")
+        app.logger.error(f"Error uploading {file.filename if file else 'unknown file'} to {bucket_name}: {type(e).__name__} - {str(e)}")
+        return None
 
-        app.logger.info(f"Attempting to upload {filename} to bucket {bucket_name}")
+def upload_bytes_to_supabase_storage(data, filename, content_type, bucket_name):
+    app.logger.info(f"Attempting to upload {filename} to bucket {bucket_name}")
 
-        # Perform the upload
-        supabase.storage.from_(bucket_name).upload(
-            path=filename,
-            file=file.read(), # file.read() is important to get bytes
-            file_options={"content-type": file.content_type}
-        )
+    # Perform the upload. Names are content hashes, so overwriting one (two admins uploading
+    # the same file at once) writes identical bytes.
+    supabase.storage.from_(bucket_name).upload(
+        path=filename,
+        file=data,
+        file_options={"content-type": content_type, "upsert": "true"}
+    )
+
+    # If no exception was raised, the upload is successful.
+    # Get the public URL using the Supabase client's method.
+    public_url = supabase.storage.from_(bucket_name).get_public_url(filename)
+    app.logger.info(f"Successfully uploaded {filename} to {bucket_name}. Public URL: {public_url}")
+    return public_url
+
+# Upload-time image processing: one decode, EXIF stripped, width-bounded WebP/AVIF variants
+IMAGE_MAX_WIDTH = int(os.getenv("IMAGE_MAX_WIDTH", "2048"))
+IMAGE_VARIANT_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(","))
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", str(50_000_000)))
+IMAGE_SAVE_OPTIONS = {
+    "jpeg": {"quality": 85, "optimize": True, "progressive": True},
+    "png": {"optimize": True},
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 55, "speed": 8},
+}
+
+
+@lru_cache(maxsize=None)
+def image_variant_formats():
+    """Variant formats this Pillow build can encode. Also configures Pillow, which loads lazily."""
+    Image.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+    return tuple(fmt for fmt in ("avif", "webp") if pil_features.check(fmt))
 
-        # If no exception was raised, the upload is successful.
-        # Get the public URL using the Supabase client's method.
-        public_url = supabase.storage.from_(bucket_name).get_public_url(filename)
-        app.logger.info(f"Successfully uploaded {filename} to {bucket_name}. Public URL: {public_url}")
-        return public_url
 
+def encode_image(img, fmt):
+    buffer = io.BytesIO()
+    # Saving without exif=/icc_profile= drops the camera metadata (GPS, device, ...).
+    with timed("image_encode", fmt):
+        img.save(buffer, format=fmt.upper(), **IMAGE_SAVE_OPTIONS[fmt])
+    return buffer.getvalue()
+
+
+def upload_image_with_variants(file, bucket_name=IMAGE_CONTENT_BUCKET):
+    """
+    Decode an uploaded image once, re-encode it without metadata, and upload
+    width-bounded variants in modern formats alongside it. Returns
+    (image_url, image_variants) where image_variants maps a format to a list
+    of {"width", "url"} dicts. Falls back to a plain upload if the file can't
+    be decoded as an image. A file that is already stored is neither decoded
+    nor uploaded; the existing objects are returned.
+    """
+    if not file or not file.filename:
+        return None, None
+
+    try:
+        base = hash_upload(file.stream)
+        existing = find_content_objects(base, bucket_name)
     except Exception as e:
-        app.logger.error(f"Error uploading {file.filename if file else 'unknown file'} to {bucket_name}: {type(e).__name__} - {str(e)}")
-        return None
+        count_content_store("failed")
+        app.logger.error(f"Could not check storage for {file.filename}: {type(e).__name__} - {str(e)}")
+        return None, None
+    if existing:
+        count_content_store("deduplicated")
+        bucket = supabase.storage.from_(bucket_name)
+        app.logger.info(f"{file.filename} is already stored as {existing['main']} in {bucket_name}; not uploading it again")
+        return bucket.get_public_url(existing["main"]), {
+            fmt: [{"width": width, "url": bucket.get_public_url(name)} for width, name in sorted(items)]
+            for fmt, items in existing["variants"].items()
+        }
+
+    variant_formats = image_variant_formats()
+    try:
+        img = Image.open(file.stream)
+        img.draft("RGB", (IMAGE_MAX_WIDTH, IMAGE_MAX_WIDTH))  # JPEG: decode at reduced scale
+        img = ImageOps.exif_transpose(img)
+        has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    except Image.DecompressionBombError as e:
+        app.logger.error(f"Rejected {file.filename}: {str(e)}")
+        return None, None
+    except Exception as e:
+        app.logger.warning(f"Could not decode {file.filename} as an image, uploading as-is: {type(e).__name__} - {str(e)}")
+        file.stream.seek(0)
+        return upload_to_supabase_storage(file, bucket_name), None
+
+    try:
+        if img.width > IMAGE_MAX_WIDTH:
+            img.thumbnail((IMAGE_MAX_WIDTH, IMAGE_MAX_WIDTH * 4), Image.LANCZOS)
+        main_format = "png" if has_alpha else "jpeg"
+        main_data = encode_image(img, main_format)
+
+        # Variants go up first: find_content_objects treats the main object as the marker of a complete set.
+        variants = {fmt: [] for fmt in variant_formats}
+        widths = sorted({min(w, img.width) for w in IMAGE_VARIANT_WIDTHS})
+        for width in widths:
+            resized = img if width == img.width else img.resize(
+                (width, max(1, round(img.height * width / img.width))), Image.LANCZOS
+            )
+            for fmt in variant_formats:
+                url = upload_bytes_to_supabase_storage(
+                    encode_image(resized, fmt), f"{base}_{width}w.{fmt}", f"image/{fmt}", bucket_name
+                )
+                variants[fmt].append({"width": width, "url": url})
+        image_url = upload_bytes_to_supabase_storage(
+            main_data, f"{base}.{'png' if has_alpha else 'jpg'}", f"image/{main_format}", bucket_name
+        )
+        count_content_store("uploaded")
+        return image_url, variants
+    except Exception as e:
+        count_content_store("failed")
+        app.logger.error(f"Error processing image {file.filename} for {bucket_name}: {type(e).__name__} - {str(e)}")
+        return None, None
+
+
+@app.template_global()
+def image_srcset(image_variants, fmt):
+    return ", ".join(f"{v['url']} {v['width']}w" for v in (image_variants or {}).get(fmt, []))
 
 # Helper function to delete image from Supabase Storage
 def delete_from_supabase_storage(image_url, bucket_name):
@@ -93,48 +1383,1480 @@ def delete_from_supabase_storage(image_url, bucket_name):
             filename = filename.split('?')[0]
         app.logger.info(f"Extracted filename for deletion: '{filename}'")
 
-        # Attempt to remove the file
-        app.logger.info(f"Attempting Supabase storage.from_('{bucket_name}').remove(['{filename}'])")
-        response_list = supabase.storage.from_(bucket_name).remove([filename])
-        app.logger.info(f"Supabase raw response for deleting '{filename}': {response_list}")
+        # Attempt to remove the file
+        app.logger.info(f"Attempting Supabase storage.from_('{bucket_name}').remove(['{filename}'])")
+        response_list = supabase.storage.from_(bucket_name).remove([filename])
+        app.logger.info(f"Supabase raw response for deleting '{filename}': {response_list}")
+
+        if response_list is None:
+            app.logger.error(f"Supabase returned None response for deletion of '{filename}'. This is unexpected. Assuming failure.")
+            return False
+
+        # Default to True. If response_list is empty (e.g., file not found, or simple success), it's a success.
+        # If there are items in response_list, we check them for errors.
+        deletion_successful = True
+        for item_idx, item in enumerate(response_list):
+            app.logger.debug(f"Processing response item {item_idx} for '{filename}': {item}")
+            if not isinstance(item, dict):
+                app.logger.error(f"Response item {item_idx} for '{filename}' is not a dict: {item}. Marking as failure.")
+                deletion_successful = False
+                break # An invalid response item means we can't be sure, so flag as error
+
+            # Check for an error field within the item. Supabase often uses 'error' key.
+            # It could be None or an object.
+            item_error = item.get("error")
+            if item_error is not None: # If 'error' key exists and is not None, it's an error
+                app.logger.error(f"Deletion failure reported by Supabase for '{filename}' (item {item_idx}). Error: '{item_error}'. Message: '{item.get('message', 'N/A')}'. Full item: {item}")
+                deletion_successful = False
+                break # Single file deletion, one error means failure
+            else:
+                # No 'error' key, or 'error' key is None. This is good.
+                # Check for 'message' field for more info, some supabase versions might put "Successfully deleted" or similar here
+                # item_message = item.get("message")
+                # item_status_code = item.get("status_code", item.get("status"))
+                # For now, the absence of an 'error' object is sufficient for success per item.
+                app.logger.info(f"No error reported in response item {item_idx} for '{filename}'. Assuming success for this item. Item: {item}")
+
+        app.logger.info(f"Exiting delete_from_supabase_storage for '{filename}'. Overall success: {deletion_successful}")
+        return deletion_successful
+
+    except Exception as e:
+        # Log detailed error including filename if available
+        log_filename = filename if filename else f"unknown (URL: {image_url})"
+        app.logger.error(f"Exception in delete_from_supabase_storage for '{log_filename}' from bucket '{bucket_name}'. Type: {type(e).__name__}. Error: {str(e)}. Traceback: {traceback.format_exc()}")
+        return False
+
+# In-process read-through cache for hot read paths (homepage feeds)
+class TTLCache:
+    """
+    Bounded LRU cache whose entries are fresh for `ttl` seconds and may then be
+    served stale for another `stale_ttl` seconds while a background thread
+    reloads them. Writers call invalidate() so admins see their changes at once.
+    Concurrent misses for one key share a single load. With `last_good`, a
+    failed load falls back to the last value loaded for the key, however old
+    or invalidated, so read paths survive a backend outage.
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, maxsize=128, last_good=False):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._last_good = OrderedDict() if last_good else None  # key -> value, kept across invalidate()
+        self._refreshing = set()
+        self._loading = {}  # key -> Future of the load other callers wait on
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refresh_errors = 0
+        self.fallbacks = 0
+
+    def get_or_load(self, key, loader):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age < self.ttl:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    self._entries.move_to_end(key)
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key, loader, self._generation), daemon=True
+                        ).start()
+                    return value
+            self.misses += 1
+            generation = self._generation
+            future = self._loading.get(key)
+            leader = future is None
+            if leader:
+                future = self._loading[key] = Future()
+            else:
+                # Someone is already loading this key (a cold start, or right after invalidate()).
+                self.coalesced += 1
+        if not leader:
+            return future.result()  # raises the leader's error too
+
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                if self._loading.get(key) is future:
+                    del self._loading[key]
+                if self._last_good is None or key not in self._last_good:
+                    future.set_exception(e)
+                    raise
+                self.fallbacks += 1
+                value = self._last_good[key]
+            future.set_result(value)
+            app.logger.warning(f"{self.name} cache: serving last known good '{key}' after {type(e).__name__} - {str(e)}")
+            return value
+        self._store(key, value, generation)
+        with self._lock:
+            if self._loading.get(key) is future:
+                del self._loading[key]
+        future.set_result(value)
+        return value
+
+    def _refresh(self, key, loader, generation):
+        try:
+            self._store(key, loader(), generation)
+        except Exception as e:
+            with self._lock:
+                self.refresh_errors += 1
+            app.logger.warning(f"{self.name} cache: background refresh of '{key}' failed: {type(e).__name__} - {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, value, generation):
+        with self._lock:
+            # A write invalidated the cache while we were loading; don't resurrect old data.
+            if generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+            if self._last_good is not None:
+                self._last_good[key] = value
+                self._last_good.move_to_end(key)
+                while len(self._last_good) > self.maxsize:
+                    self._last_good.popitem(last=False)
+
+    def has(self, key):
+        """True when get_or_load would answer from memory (fresh or stale) without calling the loader."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and time.monotonic() - entry[1] < self.ttl + self.stale_ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[1] < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[0]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            generation = self._generation
+        self._store(key, value, generation)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            self._generation += 1
+            # Loads already running may return pre-write data; later callers start their own.
+            if key is None:
+                self._entries.clear()
+                self._loading.clear()
+            else:
+                self._entries.pop(key, None)
+                self._loading.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "stale_ttl": self.stale_ttl,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "refresh_errors": self.refresh_errors,
+                "fallbacks": self.fallbacks,
+            }
+
+
+feed_cache = TTLCache(
+    "feeds",
+    ttl=float(os.getenv("FEED_CACHE_TTL", "60")),
+    stale_ttl=float(os.getenv("FEED_CACHE_STALE_TTL", "300")),
+    maxsize=int(os.getenv("FEED_CACHE_MAXSIZE", "32")),
+    last_good=True,
+)
+
+
+def get_active_feed(table_name):
+    def load():
+        resp = (
+            supabase.table(table_name)
+            .select("*, image_url")
+            .eq("is_active", True)
+            .order("date_posted", desc=True)
+            .limit(8)
+            .execute()
+        )
+        return PostView.from_rows(resp.data or [])
+
+    return feed_cache.get_or_load(table_name, load)
+
+
+# Pages of the public JSON/RSS/Atom feeds, keyed by (table, cursor, page size)
+public_page_cache = TTLCache(
+    "public_pages",
+    ttl=float(os.getenv("PUBLIC_PAGE_CACHE_TTL", "60")),
+    stale_ttl=float(os.getenv("PUBLIC_PAGE_CACHE_STALE_TTL", "300")),
+    maxsize=int(os.getenv("PUBLIC_PAGE_CACHE_MAXSIZE", "128")),
+    last_good=True,
+)
+
+
+def invalidate_feeds(table_name):
+    feed_cache.invalidate(table_name)
+    # A write can shift every cursor page of the table, so drop them all.
+    public_page_cache.invalidate()
+
+
+# In-memory index of maintenance windows and the latest patch note
+class StatusSnapshot:
+    """
+    Maintenance windows sorted by start time, with a running maximum of end
+    times, so "active now" and "next upcoming" are binary searches instead
+    of database queries.
+    """
+
+    def __init__(self, maintenance_rows, latest_patch_note):
+        windows = []
+        for row in maintenance_rows:
+            if not row.get("start_time"):
+                continue
+            start = parse_timestamp(row["start_time"]).timestamp()
+            end = parse_timestamp(row["end_time"]).timestamp() if row.get("end_time") else float("inf")
+            windows.append((start, end, row))
+        windows.sort(key=lambda w: w[0])
+        self._starts = [w[0] for w in windows]
+        self._ends = [w[1] for w in windows]
+        self._rows = [w[2] for w in windows]
+        self._max_ends = list(itertools.accumulate(self._ends, max))
+        self.latest_patch_note = latest_patch_note
+
+    def active(self, now):
+        # Latest-starting window that has started and not yet ended.
+        i = bisect_right(self._starts, now) - 1
+        while i >= 0 and self._max_ends[i] >= now:
+            if self._ends[i] >= now:
+                return self._rows[i]
+            i -= 1
+        return None
+
+    def upcoming(self, now):
+        i = bisect_right(self._starts, now)
+        return self._rows[i] if i < len(self._rows) else None
+
+
+status_cache = TTLCache(
+    "status",
+    ttl=float(os.getenv("STATUS_CACHE_TTL", "60")),
+    stale_ttl=float(os.getenv("STATUS_CACHE_STALE_TTL", "600")),
+    maxsize=1,
+    last_good=True,
+)
+
+
+def load_status_snapshot():
+    results = (
+        QueryBatch()
+        .add("maintenance", lambda: supabase.table("system_maintenance").select("*").order("start_time").execute().data)
+        .add("patch_note", lambda: supabase.table("patch_notes").select("*").order("date", desc=True).limit(1).execute().data)
+        .run()
+    )
+    for result in results.values():
+        if not result.ok:
+            raise result.error
+    patch_notes = results["patch_note"].value or []
+    return StatusSnapshot(results["maintenance"].value or [], patch_notes[0] if patch_notes else None)
+
+
+def get_status_snapshot():
+    return status_cache.get_or_load("status", load_status_snapshot)
+
+
+def build_status_payload(status, now):
+    active = status.active(now)
+    upcoming = status.upcoming(now)
+    return {
+        "maintenance": active or upcoming,
+        "active_maintenance": active,
+        "upcoming_maintenance": upcoming,
+        "patch_note": status.latest_patch_note,
+    }
+
+
+# Push channel for status changes: publishers feed the hub, SSE streams fan it out.
+# Off by default: each stream holds a worker thread, and serverless runtimes (Vercel's
+# Python runtime included) buffer the response so it never streams. Admin pages poll
+# /api/status instead; set STATUS_EVENTS=1 only where responses really stream.
+STATUS_EVENTS = os.getenv("STATUS_EVENTS", "0") == "1"
+STATUS_POLL_INTERVAL = int(os.getenv("STATUS_POLL_INTERVAL", "60"))  # seconds; 0 polls once per page
+SSE_HEARTBEAT_INTERVAL = float(os.getenv("SSE_HEARTBEAT_INTERVAL", "15"))
+SSE_MAX_STREAM_SECONDS = float(os.getenv("SSE_MAX_STREAM_SECONDS", "300"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+SSE_COALESCE_WINDOW = float(os.getenv("SSE_COALESCE_WINDOW", "0.25"))
+STATUS_EVENTS_SOURCE = os.getenv("STATUS_EVENTS_SOURCE", "realtime")  # "realtime" or "local"
+STATUS_TABLES = ("system_maintenance", "patch_notes")
+
+
+class EventHub:
+    """
+    Wakes every open stream when something changes. Streams only track the
+    sequence number they last saw, so a burst of publishes between two
+    wakeups is coalesced into a single update.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self.sequence = 0
+        self.subscribers = 0
+
+    def publish(self):
+        with self._cond:
+            self.sequence += 1
+            self._cond.notify_all()
+
+    def subscribe(self):
+        with self._cond:
+            self.subscribers += 1
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+    def wait(self, seen, timeout):
+        with self._cond:
+            self._cond.wait_for(lambda: self.sequence != seen, timeout)
+            return self.sequence
+
+
+class LocalStatusPublisher:
+    """Publishes changes the app reports itself via notify(); also the stand-in for tests."""
+
+    def __init__(self):
+        self._on_change = None
+
+    def start(self, on_change):
+        self._on_change = on_change
+
+    def notify(self, table_name):
+        if self._on_change:
+            self._on_change(table_name)
+
+
+class SupabaseRealtimePublisher(LocalStatusPublisher):
+    """Listens for postgres changes on the status tables through Supabase Realtime."""
+
+    def __init__(self, url, key, tables):
+        super().__init__()
+        self.url = url
+        self.key = key
+        self.tables = tables
+        self._thread = None
+
+    def start(self, on_change):
+        super().start(on_change)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="status-realtime", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        from realtime import AsyncRealtimeClient
+
+        async def subscribe():
+            client = AsyncRealtimeClient(f"{self.url}/realtime/v1", self.key)
+            await client.connect()
+            channel = client.channel("e-looc-status")
+            for table_name in self.tables:
+                channel.on_postgres_changes("*", table=table_name, callback=lambda payload, t=table_name: self.notify(t))
+            await channel.subscribe()
+
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(subscribe())
+            loop.run_forever()  # the client's listen/heartbeat tasks live on this loop
+        except Exception as e:
+            # Streams still pick up changes when the status cache refreshes.
+            app.logger.error(f"Supabase realtime subscription failed: {type(e).__name__} - {str(e)}")
+
+
+status_events = EventHub()
+status_publisher = (
+    SupabaseRealtimePublisher(SUPABASE_URL, SUPABASE_KEY, STATUS_TABLES)
+    if STATUS_EVENTS_SOURCE == "realtime" and DATA_BACKEND == "supabase"
+    else LocalStatusPublisher()
+)
+
+
+def publish_local_status_write(table_name):
+    if table_name in STATUS_TABLES:
+        status_publisher.notify(table_name)
+
+
+if DATA_BACKEND != "supabase":
+    # The local backend reports its own writes, standing in for Realtime.
+    data_client.listeners.append(publish_local_status_write)
+
+_status_publisher_started = False
+_status_publisher_lock = threading.Lock()
+
+
+def on_status_change(table_name):
+    status_cache.invalidate()
+    status_events.publish()
+
+
+@app.template_global()
+def status_updates_config():
+    return {"events": STATUS_EVENTS, "poll_interval": STATUS_POLL_INTERVAL}
+
+
+def ensure_status_publisher():
+    # Started on the first stream rather than at import, to keep cold starts cheap.
+    global _status_publisher_started
+    if _status_publisher_started:
+        return
+    with _status_publisher_lock:
+        # Two first streams can arrive together; only one may start the Realtime subscription.
+        if not _status_publisher_started:
+            status_publisher.start(on_status_change)
+            _status_publisher_started = True
+
+
+# Maintained content counters, so the dashboard doesn't count rows on every view
+COUNTER_RECONCILE_INTERVAL = float(os.getenv("COUNTER_RECONCILE_INTERVAL", "600"))
+COUNTER_COUNT_MODE = os.getenv("COUNTER_COUNT_MODE", "estimated")  # exact, planned or estimated
+
+
+class ContentCounters:
+    """
+    Total and active row counts per table, adjusted in place by the views
+    that create, delete or (de)activate posts, and reconciled against the
+    database every `reconcile_interval` seconds. Reconciliation uses
+    PostgREST's `count_mode`; "estimated" reads the planner's estimate for
+    large tables instead of scanning them.
+    """
+
+    def __init__(self, tables, reconcile_interval, count_mode):
+        self.reconcile_interval = reconcile_interval
+        self.count_mode = count_mode
+        self._counts = {table: None for table in tables}  # table -> {"total", "active"}
+        self._reconciled_at = {table: 0.0 for table in tables}
+        self._reconciling = set()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self.reconciliations = 0
+
+    def get(self, table_name):
+        """Counts for the table, or None while they can't be had (first count failed or timed out)."""
+        with self._cond:
+            counts = self._counts[table_name]
+            if counts is None and table_name in self._reconciling:
+                # Another request is doing the first count; wait for it rather than report zero posts.
+                self._cond.wait_for(lambda: table_name not in self._reconciling, DEFAULT_QUERY_TIMEOUT)
+                counts = self._counts[table_name]
+                return dict(counts) if counts is not None else None
+            stale = time.monotonic() - self._reconciled_at[table_name] >= self.reconcile_interval
+            refresh = stale and table_name not in self._reconciling
+            if refresh:
+                self._reconciling.add(table_name)
+        if counts is None:
+            # First use: nothing to serve yet, so count synchronously.
+            return self.reconcile(table_name)
+        if refresh:
+            threading.Thread(target=self.reconcile, args=(table_name,), daemon=True).start()
+        return dict(counts)
+
+    def adjust(self, table_name, total=0, active=0):
+        with self._lock:
+            counts = self._counts[table_name]
+            if counts is not None:
+                counts["total"] = max(0, counts["total"] + total)
+                counts["active"] = max(0, counts["active"] + active)
+
+    def mark_stale(self, table_name):
+        # For changes we can't express as a delta; the next read reconciles.
+        with self._lock:
+            self._reconciled_at[table_name] = 0.0
+
+    def reconcile(self, table_name):
+        # The two counts run inline: get() is called from QueryBatch workers, and a
+        # nested batch on the same pool can wait on itself.
+        try:
+            query = lambda: supabase.table(table_name).select("id", count=self.count_mode, head=True)
+            counts = {"total": query().execute().count or 0, "active": query().eq("is_active", True).execute().count or 0}
+        except Exception as e:
+            app.logger.warning(f"Counting {table_name} failed: {e}")
+            with self._lock:
+                counts = self._counts[table_name]
+                return dict(counts) if counts is not None else None
+        else:
+            with self._lock:
+                self._counts[table_name] = counts
+                self._reconciled_at[table_name] = time.monotonic()
+                self.reconciliations += 1
+                return dict(counts)
+        finally:
+            with self._cond:
+                self._reconciling.discard(table_name)
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {"counts": dict(self._counts), "reconciliations": self.reconciliations, "count_mode": self.count_mode}
+
+
+content_counters = ContentCounters(("bulletin_posts", "news_posts"), COUNTER_RECONCILE_INTERVAL, COUNTER_COUNT_MODE)
+
+
+# In-process full-text search over bulletin and news posts (BM25 over title + content)
+SEARCH_SNAPSHOT_PATH = os.getenv("SEARCH_SNAPSHOT_PATH", os.path.join(tempfile.gettempdir(), "e-looc-search.json.gz"))
+SEARCH_REBUILD_INTERVAL = float(os.getenv("SEARCH_REBUILD_INTERVAL", "900"))
+SEARCH_SNAPSHOT_DELAY = 5  # seconds; coalesces snapshot writes after a burst of edits
+SEARCH_SNAPSHOT_VERSION = 1  # bump when the tokenizer or snapshot layout changes
+SEARCH_TABLES = ("bulletin_posts", "news_posts")
+SEARCH_COLUMNS = "id, title, content, is_active, date_posted, image_url, image_variants"
+SEARCH_TITLE_WEIGHT = 2
+SEARCH_PREFIX_WEIGHT = 0.5
+SEARCH_MAX_EXPANSIONS = 50
+SEARCH_SNIPPET_LENGTH = 160
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+SEARCH_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+SEARCH_STOPWORDS = frozenset(
+    # English
+    "a an and are as at be by for from in is it of on or that the this to was were will with "
+    # Tagalog
+    "ang ay at ako ikaw ito iyan iyon kay kami kayo ko mga mo na namin nang natin ng ni nila "
+    "niya o pa para po ho rin din lang sa si siya sila tayo yan yung".split()
+)
+
+
+def tokenize(text):
+    """Lowercase, strip accents ("ñ" -> "n") and drop English/Tagalog stopwords."""
+    text = unicodedata.normalize("NFKD", (text or "").lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    tokens = []
+    for word in SEARCH_TOKEN_RE.findall(text):
+        parts = word.split("-")
+        if len(parts) > 1:
+            # Tagalog hyphenates affixes ("mag-aaral", "ika-5"); index the joined form too.
+            tokens.append("".join(parts))
+        tokens.extend(parts)
+    return [token for token in tokens if token not in SEARCH_STOPWORDS]
+
+
+class SearchIndex:
+    """
+    Inverted index over the title and content of posts, keyed by (table, id).
+    Built lazily on the first query, either from an on-disk snapshot or from
+    the database, then kept current by the views that write posts. Rows are
+    rebuilt from the database every `rebuild_interval` seconds in the
+    background, which also picks up writes made by other instances.
+    """
+
+    def __init__(self, tables, snapshot_path, rebuild_interval):
+        self.tables = tables
+        self.snapshot_path = snapshot_path
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._reset()
+        self._built_at = None  # wall-clock time of the data the index reflects
+        self._building = False
+        self._pending = []  # writes seen while a rebuild is reading the database
+        self._snapshot_timer = None
+        self.queries = 0
+        self.rebuilds = 0
+        self.snapshot_loads = 0
+
+    def _reset(self):
+        self._docs = {}  # key -> stored fields returned with results
+        self._doc_terms = {}  # key -> {term: weighted tf}
+        self._doc_lengths = {}
+        self._postings = {}  # term -> {key: weighted tf}
+        self._vocab = []  # sorted terms, for prefix lookups
+        self._total_length = 0
+
+    def _add(self, key, row):
+        tf = {}
+        for token in tokenize(row.get("title")):
+            tf[token] = tf.get(token, 0) + SEARCH_TITLE_WEIGHT
+        for token in tokenize(row.get("content")):
+            tf[token] = tf.get(token, 0) + 1
+        self._docs[key] = {
+            "id": row["id"],
+            "title": row.get("title") or "",
+            "snippet": (row.get("content") or "")[:SEARCH_SNIPPET_LENGTH],
+            "is_active": bool(row.get("is_active")),
+            "date_posted": row.get("date_posted"),
+            "image_url": row.get("image_url"),
+            "image_variants": row.get("image_variants"),
+        }
+        self._index_terms(key, tf)
+
+    def _index_terms(self, key, tf):
+        self._doc_terms[key] = tf
+        self._doc_lengths[key] = sum(tf.values())
+        self._total_length += self._doc_lengths[key]
+        for term, count in tf.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                insort(self._vocab, term)
+            postings[key] = count
+
+    def _discard(self, key):
+        tf = self._doc_terms.pop(key, None)
+        if tf is None:
+            return
+        del self._docs[key]
+        self._total_length -= self._doc_lengths.pop(key)
+        for term in tf:
+            postings = self._postings[term]
+            del postings[key]
+            if not postings:
+                del self._postings[term]
+                del self._vocab[bisect_left(self._vocab, term)]
+
+    def upsert(self, table_name, row):
+        """Index a full post row (title, content, is_active, ...), replacing any previous version."""
+        with self._lock:
+            if self._building:
+                self._pending.append((table_name, row["id"], row))
+            if self._built_at is None:
+                return  # Not loaded yet; the lazy build will read this row.
+            key = (table_name, row["id"])
+            self._discard(key)
+            self._add(key, row)
+        self._schedule_snapshot()
+
+    def remove(self, table_name, post_id):
+        with self._lock:
+            if self._building:
+                self._pending.append((table_name, post_id, None))
+            if self._built_at is None:
+                return
+            self._discard((table_name, post_id))
+        self._schedule_snapshot()
+
+    def ensure_loaded(self):
+        if self._built_at is None:
+            with self._load_lock:
+                if self._built_at is None and not self.load_snapshot():
+                    self.rebuild()
+        elif time.time() - self._built_at >= self.rebuild_interval and not self._building:
+            threading.Thread(target=self.rebuild, daemon=True).start()
+
+    def rebuild(self, page_size=1000):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._pending = []
+        try:
+            started_at = time.time()
+            fresh = SearchIndex(self.tables, self.snapshot_path, self.rebuild_interval)
+            for table_name in self.tables:
+                start = 0
+                while True:
+                    rows = (
+                        supabase.table(table_name)
+                        .select(SEARCH_COLUMNS)
+                        .order("id")
+                        .range(start, start + page_size - 1)
+                        .execute()
+                        .data
+                        or []
+                    )
+                    for row in rows:
+                        fresh._add((table_name, row["id"]), row)
+                    if len(rows) < page_size:
+                        break
+                    start += page_size
+        except Exception as e:
+            app.logger.error(f"Search index rebuild failed: {type(e).__name__} - {str(e)}")
+            with self._lock:
+                self._building = False
+                if self._built_at is None:
+                    # Serve an empty index rather than hitting the database on every query.
+                    self._built_at = time.time() - self.rebuild_interval
+            return
+        with self._lock:
+            for attr in ("_docs", "_doc_terms", "_doc_lengths", "_postings", "_vocab", "_total_length"):
+                setattr(self, attr, getattr(fresh, attr))
+            # Replay writes that raced with the read above.
+            for table_name, post_id, row in self._pending:
+                self._discard((table_name, post_id))
+                if row is not None:
+                    self._add((table_name, post_id), row)
+            self._pending = []
+            self._building = False
+            self._built_at = started_at
+            self.rebuilds += 1
+        self.save_snapshot()
+
+    def _expand(self, term):
+        """Yield (indexed term, weight) for an exact match and up to SEARCH_MAX_EXPANSIONS prefix matches."""
+        if term in self._postings:
+            yield term, 1.0
+        i = bisect_right(self._vocab, term)
+        for candidate in self._vocab[i:i + SEARCH_MAX_EXPANSIONS]:
+            if not candidate.startswith(term):
+                break
+            yield candidate, SEARCH_PREFIX_WEIGHT
+
+    def search(self, query, tables=None, active_only=True, limit=20):
+        """Return up to `limit` matching posts, best first, each with "table" and "score" keys."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        self.ensure_loaded()
+        with self._lock:
+            self.queries += 1
+            doc_count = len(self._docs)
+            if not doc_count:
+                return []
+            avg_length = self._total_length / doc_count
+            scores = {}
+            for term in terms:
+                for match, weight in self._expand(term):
+                    postings = self._postings[match]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, tf in postings.items():
+                        if tables and key[0] not in tables:
+                            continue
+                        if active_only and not self._docs[key]["is_active"]:
+                            continue
+                        norm = SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * self._doc_lengths[key] / avg_length)
+                        scores[key] = scores.get(key, 0.0) + weight * idf * tf * (SEARCH_BM25_K1 + 1) / (tf + norm)
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [dict(self._docs[key], table=key[0], score=round(score, 4)) for key, score in top]
+
+    def _schedule_snapshot(self):
+        with self._lock:
+            if self._snapshot_timer is None:
+                self._snapshot_timer = threading.Timer(SEARCH_SNAPSHOT_DELAY, self.save_snapshot)
+                self._snapshot_timer.daemon = True
+                self._snapshot_timer.start()
+
+    def save_snapshot(self):
+        with self._lock:
+            self._snapshot_timer = None
+            if self._built_at is None:
+                return
+            keys = list(self._docs)
+            positions = {key: i for i, key in enumerate(keys)}
+            payload = {
+                "version": SEARCH_SNAPSHOT_VERSION,
+                "built_at": self._built_at,
+                "docs": [[key[0], self._docs[key]] for key in keys],
+                # term -> flat [doc position, tf, doc position, tf, ...]
+                "postings": {
+                    term: [n for key, tf in postings.items() for n in (positions[key], tf)]
+                    for term, postings in self._postings.items()
+                },
+            }
+        try:
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            app.logger.warning(f"Could not write search snapshot {self.snapshot_path}: {str(e)}")
+
+    def load_snapshot(self):
+        try:
+            with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            app.logger.warning(f"Ignoring unreadable search snapshot {self.snapshot_path}: {str(e)}")
+            return False
+        if payload.get("version") != SEARCH_SNAPSHOT_VERSION:
+            return False
+        keys = [(table_name, doc["id"]) for table_name, doc in payload["docs"]]
+        doc_terms = {key: {} for key in keys}
+        for term, flat in payload["postings"].items():
+            for i in range(0, len(flat), 2):
+                doc_terms[keys[flat[i]]][term] = flat[i + 1]
+        with self._lock:
+            self._reset()
+            for key, (table_name, doc) in zip(keys, payload["docs"]):
+                self._docs[key] = doc
+                self._index_terms(key, doc_terms[key])
+            # An old snapshot is still served; ensure_loaded() refreshes it in the background.
+            self._built_at = payload["built_at"]
+            self.snapshot_loads += 1
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "docs": len(self._docs),
+                "terms": len(self._vocab),
+                "queries": self.queries,
+                "rebuilds": self.rebuilds,
+                "snapshot_loads": self.snapshot_loads,
+                "age": None if self._built_at is None else round(time.time() - self._built_at, 1),
+            }
+
+
+search_index = SearchIndex(SEARCH_TABLES, SEARCH_SNAPSHOT_PATH, SEARCH_REBUILD_INTERVAL)
+
+
+# Concurrent fan-out for independent Supabase queries
+query_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("QUERY_POOL_SIZE", "8")),
+    thread_name_prefix="supabase-query",
+)
+DEFAULT_QUERY_TIMEOUT = float(os.getenv("QUERY_TIMEOUT", "5"))
+
+
+class QueryResult:
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class QueryBatch:
+    """
+    Runs independent queries on the shared pool and collects a QueryResult per
+    query name, so page latency is the slowest query rather than the sum. A
+    query that exceeds its timeout is reported as failed; it is not cancelled.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = DEFAULT_QUERY_TIMEOUT if timeout is None else timeout
+        self._queries = OrderedDict()  # name -> (fn, timeout)
+
+    def add(self, name, fn, timeout=None):
+        self._queries[name] = (fn, self.timeout if timeout is None else timeout)
+        return self
+
+    def run(self):
+        started = time.monotonic()
+        # Each query runs in a copy of the caller's context, so its timings land on this request.
+        futures = OrderedDict(
+            (name, (query_executor.submit(contextvars.copy_context().run, fn), timeout))
+            for name, (fn, timeout) in self._queries.items()
+        )
+        results = {}
+        for name, (future, timeout) in futures.items():
+            remaining = max(0.0, timeout - (time.monotonic() - started))
+            try:
+                results[name] = QueryResult(value=future.result(timeout=remaining))
+            except FutureTimeoutError:
+                app.logger.error(f"Query '{name}' timed out after {timeout}s")
+                results[name] = QueryResult(error=TimeoutError(f"query '{name}' timed out after {timeout}s"))
+            except Exception as e:
+                app.logger.error(f"Query '{name}' failed: {type(e).__name__} - {str(e)}")
+                results[name] = QueryResult(error=e)
+        return results
+
+
+# Full-response cache and conditional GET for public pages
+response_cache = TTLCache(
+    "responses",
+    ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+    maxsize=int(os.getenv("RESPONSE_CACHE_MAXSIZE", "64")),
+)
+GZIP_MIN_SIZE = 1024
+_template_version = None
+
+
+def get_template_version():
+    # Templates and asset URLs only change on deploy, so fingerprint them once per process.
+    global _template_version
+    if _template_version is None:
+        digest = hashlib.sha1(json.dumps(get_asset_manifest(), sort_keys=True).encode())
+        for root, _, files in sorted(os.walk(os.path.join(app.root_path, app.template_folder))):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{root}/{name}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        _template_version = digest.hexdigest()[:16]
+    return _template_version
+
+
+def version_default(value):
+    return value.to_dict() if isinstance(value, PostView) else str(value)
+
+
+def content_version(*parts):
+    """Stable digest of the data a page is rendered from, for use in ETags."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=version_default).encode()).hexdigest()
+
+
+def cached_response(version_func=None, max_age=0):
+    """
+    Cache a public view's rendered bytes keyed by path and content version,
+    and answer If-None-Match / If-Modified-Since with 304 Not Modified.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_func() if version_func else ""
+            etag = hashlib.sha1(f"{request.path}:{get_template_version()}:{version}".encode()).hexdigest()
+
+            key = (request.path, etag)
+            entry = response_cache.get(key)
+            if entry is None:
+                rendered = app.make_response(view(*args, **kwargs))
+                if rendered.status_code != 200:
+                    return rendered
+                body = rendered.get_data()
+                entry = {
+                    "body": body,
+                    "gzip": gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None,
+                    "mimetype": rendered.mimetype,
+                    "last_modified": datetime.now(timezone.utc).replace(microsecond=0),
+                }
+                response_cache.set(key, entry)
+
+            resp = app.response_class(mimetype=entry["mimetype"])
+            resp.set_etag(etag)
+            resp.last_modified = entry["last_modified"]
+            resp.cache_control.public = True
+            if max_age:
+                resp.cache_control.max_age = max_age
+            else:
+                resp.cache_control.no_cache = True
+            resp.vary.add("Accept-Encoding")
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains(etag)
+            else:
+                not_modified = bool(request.if_modified_since) and request.if_modified_since >= entry["last_modified"]
+            if not_modified:
+                resp.status_code = 304
+                return resp
+
+            if entry["gzip"] is not None and "gzip" in request.accept_encodings:
+                resp.set_data(entry["gzip"])
+                resp.content_encoding = "gzip"
+            else:
+                resp.set_data(entry["body"])
+            return resp
+
+        return wrapper
+
+    return decorator
+
+
+# Precompiled templates: build_assets.py writes Jinja bytecode here so a cold
+# start loads compiled templates instead of parsing each one on first render.
+# Jinja ignores entries written by a different Python version, so build with
+# the deployment's Python.
+JINJA_CACHE_DIR = os.getenv("JINJA_CACHE_DIR", os.path.join(app.root_path, "jinja_cache"))
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """
+    Keys bytecode by template name only, because the build and deployment
+    paths differ, and tolerates a read-only deployment directory. The source
+    checksum stored with each entry still rejects stale bytecode.
+    """
+
+    def get_cache_key(self, name, filename=None):
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()
+
+    def dump_bytecode(self, bucket):
+        try:
+            super().dump_bytecode(bucket)
+        except OSError:
+            pass
+
+
+if os.path.isdir(JINJA_CACHE_DIR):
+    app.jinja_env.bytecode_cache = TemplateBytecodeCache(JINJA_CACHE_DIR)
+
+
+# Fingerprinted static assets produced by build_assets.py
+ASSET_MANIFEST_PATH = os.path.join(app.static_folder, "manifest.json")
+ASSET_DIST_DIR = os.path.join(app.static_folder, "dist")
+_asset_manifest = None
+
+
+def get_asset_manifest():
+    global _asset_manifest
+    if _asset_manifest is None:
+        try:
+            with open(ASSET_MANIFEST_PATH) as f:
+                _asset_manifest = json.load(f)
+        except (OSError, ValueError):
+            # No build has been run; serve the original files.
+            _asset_manifest = {}
+    return _asset_manifest
+
+
+@app.template_global()
+def asset_url(filename):
+    return url_for("static", filename=get_asset_manifest().get(filename, filename))
+
+
+@app.route("/static/dist/<path:filename>")
+def static_dist(filename):
+    # Fingerprinted names change with content, so these can be cached forever.
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if encoding in request.accept_encodings and os.path.isfile(os.path.join(ASSET_DIST_DIR, filename + suffix)):
+            resp = send_from_directory(
+                ASSET_DIST_DIR, filename + suffix, mimetype=mimetypes.guess_type(filename)[0]
+            )
+            resp.content_encoding = encoding
+            break
+    else:
+        resp = send_from_directory(ASSET_DIST_DIR, filename)
+    resp.vary.add("Accept-Encoding")
+    resp.cache_control.no_cache = None
+    resp.cache_control.public = True
+    resp.cache_control.max_age = 31536000
+    resp.cache_control.immutable = True
+    return resp
+
+
+def storage_path_from_url(image_url, bucket_name):
+    parts = (image_url or "").split(f"/{bucket_name}/")
+    if len(parts) < 2 or not parts[1]:
+        return None
+    return parts[1].split("?")[0]
+
+
+def remove_storage_paths(paths, bucket_name):
+    """
+    Delete several objects from one bucket with a single storage call.
+    Returns {path: error message or None}.
+    """
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    try:
+        response_list = supabase.storage.from_(bucket_name).remove(paths)
+    except Exception as e:
+        app.logger.error(f"Batched removal of {len(paths)} objects from {bucket_name} failed: {type(e).__name__} - {str(e)}")
+        return {path: str(e) for path in paths}
+
+    errors = {
+        item.get("name"): str(item["error"])
+        for item in (response_list or [])
+        if isinstance(item, dict) and item.get("error") is not None
+    }
+    return {path: errors.get(path) for path in paths}
+
+
+def post_image_urls(post):
+    urls = [post["image_url"]] if post.get("image_url") else []
+    for variant_list in (post.get("image_variants") or {}).values():
+        urls.extend(v["url"] for v in variant_list if v.get("url"))
+    return urls
+
+
+# Background queue for storage side effects, with retry/backoff and a replayable job log
+STORAGE_JOB_LOG = os.getenv("STORAGE_JOB_LOG", os.path.join(tempfile.gettempdir(), "e-looc-storage-jobs.jsonl"))
+STORAGE_JOB_MAX_ATTEMPTS = int(os.getenv("STORAGE_JOB_MAX_ATTEMPTS", "5"))
+STORAGE_JOB_BASE_DELAY = float(os.getenv("STORAGE_JOB_BASE_DELAY", "2"))
+
+
+class StorageJobQueue:
+    """
+    Runs storage deletions on a worker thread so request handlers return
+    immediately. Every job is appended to a JSON-lines log when enqueued and
+    again when it finishes; replay() re-enqueues jobs that never finished,
+    e.g. after the process was recycled mid-retry.
+    """
+
+    def __init__(self, log_path, max_attempts, base_delay):
+        self.log_path = log_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self._queue = queue.PriorityQueue()  # (run_at, seq, job)
+        self._seq = itertools.count()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def enqueue_delete(self, bucket_name, paths, delay=0, unreferenced_only=False):
+        """
+        Queue removal of `paths`, starting `delay` seconds from now. With
+        unreferenced_only, paths that image_refs lists again by the time the
+        job runs are kept.
+        """
+        paths = sorted(set(p for p in paths if p))
+        if not paths:
+            return None
+        job = {"id": uuid.uuid4().hex, "bucket": bucket_name, "paths": paths, "attempts": 0}
+        if delay:
+            job["delay"] = delay
+        if unreferenced_only:
+            job["unreferenced_only"] = True
+        self._log("enqueued", job)
+        self._put(job, time.monotonic() + delay)
+        return job["id"]
+
+    def replay(self):
+        pending = OrderedDict()
+        try:
+            with open(self.log_path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn write from a crash
+                    if record["event"] == "enqueued":
+                        pending[record["job"]["id"]] = record["job"]
+                    else:
+                        pending.pop(record["job"]["id"], None)
+        except OSError:
+            return 0
+
+        with self._lock:
+            # Compact the log down to the jobs that are still pending.
+            with open(self.log_path, "w") as f:
+                for job in pending.values():
+                    f.write(json.dumps({"event": "enqueued", "job": job}) + "\n")
+        for job in pending.values():
+            self._put(job, time.monotonic() + job.get("delay", 0))
+        if pending:
+            app.logger.info(f"Replayed {len(pending)} pending storage job(s) from {self.log_path}")
+        return len(pending)
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": self.pending(),
+                "completed": self.completed,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+    def _count(self, name):
+        # The worker bumps these while /admin/cache-stats reads them.
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _log(self, event, job):
+        try:
+            with self._lock, open(self.log_path, "a") as f:
+                f.write(json.dumps({"event": event, "job": job}) + "\n")
+        except OSError as e:
+            app.logger.warning(f"Could not write storage job log {self.log_path}: {str(e)}")
+
+    def _put(self, job, run_at):
+        self._queue.put((run_at, next(self._seq), job))
+        self._wakeup.set()
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="storage-jobs", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            # Cleared before looking at the head: a job put after this point sets it again, so the
+            # wait below can't sleep through work that is due sooner than the current head.
+            self._wakeup.clear()
+            run_at, seq, job = self._queue.get()
+            delay = run_at - time.monotonic()
+            if delay > 0:
+                # Not due yet; put it back and sleep until it is (or until newer work arrives).
+                self._queue.put((run_at, seq, job))
+                self._wakeup.wait(delay)
+                continue
+            try:
+                self._execute(job)
+            except Exception as e:
+                app.logger.error(f"Storage job {job['id']} crashed: {type(e).__name__} - {str(e)}")
+
+    def _execute(self, job):
+        job["attempts"] += 1
+        try:
+            paths = unreferenced_image_paths(job["paths"]) if job.get("unreferenced_only") else job["paths"]
+        except Exception as e:
+            errors = {path: f"reference check failed: {str(e)}" for path in job["paths"]}
+        else:
+            errors = remove_storage_paths(paths, job["bucket"])
+        failed_paths = [path for path, error in errors.items() if error]
+        if not failed_paths:
+            self._count("completed")
+            self._log("done", job)
+            return
+        if job["attempts"] >= self.max_attempts:
+            self._count("failed")
+            app.logger.error(f"Storage job {job['id']} gave up after {job['attempts']} attempts: {failed_paths}")
+            self._log("failed", job)
+            return
+        self._count("retried")
+        job["paths"] = failed_paths
+        backoff = self.base_delay * 2 ** (job["attempts"] - 1)
+        self._put(job, time.monotonic() + backoff * random.uniform(0.5, 1.5))
+
+
+storage_jobs = StorageJobQueue(STORAGE_JOB_LOG, STORAGE_JOB_MAX_ATTEMPTS, STORAGE_JOB_BASE_DELAY)
+
+
+def enqueue_image_deletion(image_urls, bucket_name):
+    # Content-addressed images don't match bucket_name and are skipped; image_refs releases them.
+    paths = [storage_path_from_url(url, bucket_name) for url in image_urls]
+    return storage_jobs.enqueue_delete(bucket_name, paths)
+
+
+# Reference counts for content-addressed images: one image_refs row per (object, post).
+# An object is removed only after its last row is gone, and only if it is still unused
+# IMAGE_RELEASE_DELAY seconds later (the same file may have been uploaded again meanwhile).
+IMAGE_REFS_TABLE = "image_refs"
+IMAGE_RELEASE_DELAY = float(os.getenv("IMAGE_RELEASE_DELAY", "300"))
+
+
+def unreferenced_image_paths(paths):
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return []
+    rows = supabase.table(IMAGE_REFS_TABLE).select("path").in_("path", paths).execute().data or []
+    referenced = {row["path"] for row in rows}
+    return [path for path in paths if path not in referenced]
+
+
+def release_images(paths):
+    """Queue removal of the content-addressed objects in `paths` that no post references."""
+    unreferenced = unreferenced_image_paths(paths)
+    count_content_store("released", len(unreferenced))
+    return storage_jobs.enqueue_delete(
+        IMAGE_CONTENT_BUCKET, unreferenced, delay=IMAGE_RELEASE_DELAY, unreferenced_only=True
+    )
+
+
+def content_image_paths(image_urls):
+    return {path for path in (storage_path_from_url(url, IMAGE_CONTENT_BUCKET) for url in image_urls) if path}
+
+
+def update_image_refs(table_name, post_id, old_urls, new_urls):
+    """
+    Move one post's references from the images in old_urls to those in
+    new_urls and release what it stopped using. Nothing is queried when the
+    sets are equal, e.g. an edit that re-uploads the same file. Failures are
+    logged, not raised: the post is already saved and the orphan sweep
+    reconciles image_refs.
+    """
+    old_paths, new_paths = content_image_paths(old_urls), content_image_paths(new_urls)
+    added, dropped = new_paths - old_paths, old_paths - new_paths
+    try:
+        if added:
+            supabase.table(IMAGE_REFS_TABLE).upsert(
+                [{"path": path, "table_name": table_name, "post_id": post_id} for path in sorted(added)],
+                on_conflict="path,table_name,post_id",
+                ignore_duplicates=True,
+            ).execute()
+        if dropped:
+            supabase.table(IMAGE_REFS_TABLE).delete().eq("table_name", table_name).eq("post_id", post_id).in_(
+                "path", sorted(dropped)
+            ).execute()
+            release_images(dropped)
+    except Exception as e:
+        app.logger.error(f"Updating image refs for {table_name} {post_id} failed: {type(e).__name__} - {str(e)}")
+
+
+def drop_image_refs(table_name, post_ids):
+    """Remove every reference held by deleted posts, with one query, and release what they used."""
+    if not post_ids:
+        return
+    try:
+        rows = (
+            supabase.table(IMAGE_REFS_TABLE).delete().eq("table_name", table_name).in_("post_id", list(post_ids)).execute().data
+            or []
+        )
+        release_images(row["path"] for row in rows)
+    except Exception as e:
+        app.logger.error(f"Dropping image refs for {len(post_ids)} {table_name} row(s) failed: {type(e).__name__} - {str(e)}")
+
+
+
+# Orphaned-image garbage collector: diffs bucket listings against the rows that reference them
+IMAGE_BUCKETS = {
+    "bulletin-images": ("bulletin_posts",),
+    "news-and-events-images": ("news_posts",),
+    IMAGE_CONTENT_BUCKET: ("bulletin_posts", "news_posts"),
+}
+ORPHAN_SWEEP_INTERVAL = float(os.getenv("ORPHAN_SWEEP_INTERVAL", "21600"))  # 0 disables the timer
+ORPHAN_GRACE_PERIOD = float(os.getenv("ORPHAN_GRACE_PERIOD", "3600"))
+ORPHAN_SWEEP_BATCH_SIZE = 100
+STORAGE_LIST_PAGE_SIZE = 1000
+
+
+def list_bucket_objects(bucket_name):
+    offset = 0
+    while True:
+        page = supabase.storage.from_(bucket_name).list(
+            "", {"limit": STORAGE_LIST_PAGE_SIZE, "offset": offset, "sortBy": {"column": "name", "order": "asc"}}
+        ) or []
+        for item in page:
+            if item.get("id") is not None or "id" not in item:  # folders are listed with id None
+                yield item
+        if len(page) < STORAGE_LIST_PAGE_SIZE:
+            return
+        offset += STORAGE_LIST_PAGE_SIZE
+
+
+def referenced_storage_paths(table_name, bucket_name, page_size=1000):
+    """{path: {post ids}} for the objects in bucket_name that rows of table_name reference."""
+    paths = {}
+    start = 0
+    while True:
+        rows = (
+            supabase.table(table_name)
+            .select("id, image_url, image_variants")
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+            or []
+        )
+        for row in rows:
+            for url in post_image_urls(row):
+                paths.setdefault(storage_path_from_url(url, bucket_name), set()).add(row["id"])
+        paths.pop(None, None)
+        if len(rows) < page_size:
+            return paths
+        start += page_size
+
+
+def stored_image_refs(page_size=1000):
+    """{(path, table_name, post_id): row id} for every image_refs row."""
+    refs = {}
+    start = 0
+    while True:
+        rows = (
+            supabase.table(IMAGE_REFS_TABLE)
+            .select("id, path, table_name, post_id")
+            .order("id")
+            .range(start, start + page_size - 1)
+            .execute()
+            .data
+            or []
+        )
+        for row in rows:
+            refs[(row["path"], row["table_name"], row["post_id"])] = row["id"]
+        if len(rows) < page_size:
+            return refs
+        start += page_size
+
+
+def reconcile_image_refs(stored, referenced):
+    """
+    Add the image_refs rows that `referenced` ({table_name: {path: {post ids}}})
+    implies and drop the ones no post holds. `stored` must be read before the
+    post tables: a post saved in between then costs a redundant upsert rather
+    than losing a reference.
+    """
+    expected = {
+        (path, table_name, post_id)
+        for table_name, paths in referenced.items()
+        for path, post_ids in paths.items()
+        for post_id in post_ids
+    }
+    missing = sorted(expected - stored.keys())
+    extra = sorted(ref_id for key, ref_id in stored.items() if key not in expected)
+    for i in range(0, len(missing), ORPHAN_SWEEP_BATCH_SIZE):
+        supabase.table(IMAGE_REFS_TABLE).upsert(
+            [
+                {"path": path, "table_name": table_name, "post_id": post_id}
+                for path, table_name, post_id in missing[i:i + ORPHAN_SWEEP_BATCH_SIZE]
+            ],
+            on_conflict="path,table_name,post_id",
+            ignore_duplicates=True,
+        ).execute()
+    for i in range(0, len(extra), ORPHAN_SWEEP_BATCH_SIZE):
+        supabase.table(IMAGE_REFS_TABLE).delete().in_("id", extra[i:i + ORPHAN_SWEEP_BATCH_SIZE]).execute()
+    return {"added": len(missing), "removed": len(extra)}
+
+
+def sweep_orphaned_images(grace_period=ORPHAN_GRACE_PERIOD):
+    """Queue removal of bucket objects that no post references. Returns {bucket: orphan count}."""
+    now = datetime.now(timezone.utc)
+    summary = {}
+    for bucket_name, table_names in IMAGE_BUCKETS.items():
+        content_addressed = bucket_name == IMAGE_CONTENT_BUCKET
+        stored_refs = stored_image_refs() if content_addressed else None
+        # Snapshot the references first; an upload finishing mid-sweep is protected by the grace period.
+        referenced = {table_name: referenced_storage_paths(table_name, bucket_name) for table_name in table_names}
+        if content_addressed:
+            changes = reconcile_image_refs(stored_refs, referenced)
+            if changes["added"] or changes["removed"]:
+                app.logger.warning(f"Orphan sweep repaired image_refs: {changes}")
+        orphans = []
+        for item in list_bucket_objects(bucket_name):
+            if any(item["name"] in paths for paths in referenced.values()):
+                continue
+            created_at = item.get("created_at")
+            if created_at and (now - parse_timestamp(created_at)).total_seconds() < grace_period:
+                continue
+            orphans.append(item["name"])
+        for i in range(0, len(orphans), ORPHAN_SWEEP_BATCH_SIZE):
+            storage_jobs.enqueue_delete(
+                bucket_name, orphans[i:i + ORPHAN_SWEEP_BATCH_SIZE], unreferenced_only=content_addressed
+            )
+        summary[bucket_name] = len(orphans)
+        app.logger.info(f"Orphan sweep queued {len(orphans)} object(s) from {bucket_name} for removal")
+    return summary
+
+
+def _periodic_orphan_sweep():
+    try:
+        sweep_orphaned_images()
+    except Exception as e:
+        app.logger.error(f"Periodic orphan sweep failed: {type(e).__name__} - {str(e)}")
+    _schedule_orphan_sweep()
+
+
+def _schedule_orphan_sweep():
+    if ORPHAN_SWEEP_INTERVAL > 0:
+        timer = threading.Timer(ORPHAN_SWEEP_INTERVAL, _periodic_orphan_sweep)
+        timer.daemon = True
+        timer.start()
 
-        if response_list is None:
-            app.logger.error(f"Supabase returned None response for deletion of '{filename}'. This is unexpected. Assuming failure.")
-            return False
 
-        # Default to True. If response_list is empty (e.g., file not found, or simple success), it's a success.
-        # If there are items in response_list, we check them for errors.
-        deletion_successful = True
-        for item_idx, item in enumerate(response_list):
-            app.logger.debug(f"Processing response item {item_idx} for '{filename}': {item}")
-            if not isinstance(item, dict):
-                app.logger.error(f"Response item {item_idx} for '{filename}' is not a dict: {item}. Marking as failure.")
-                deletion_successful = False
-                break # An invalid response item means we can't be sure, so flag as error
+_background_jobs_started = False
+_background_jobs_lock = threading.Lock()
 
-            # Check for an error field within the item. Supabase often uses 'error' key.
-            # It could be None or an object.
-            item_error = item.get("error")
-            if item_error is not None: # If 'error' key exists and is not None, it's an error
-                app.logger.error(f"Deletion failure reported by Supabase for '{filename}' (item {item_idx}). Error: '{item_error}'. Message: '{item.get('message', 'N/A')}'. Full item: {item}")
-                deletion_successful = False
-                break # Single file deletion, one error means failure
-            else:
-                # No 'error' key, or 'error' key is None. This is good.
-                # Check for 'message' field for more info, some supabase versions might put "Successfully deleted" or similar here
-                # item_message = item.get("message")
-                # item_status_code = item.get("status_code", item.get("status"))
-                # For now, the absence of an 'error' object is sufficient for success per item.
-                app.logger.info(f"No error reported in response item {item_idx} for '{filename}'. Assuming success for this item. Item: {item}")
 
-        app.logger.info(f"Exiting delete_from_supabase_storage for '{filename}'. Overall success: {deletion_successful}")
-        return deletion_successful
+@app.before_request
+def start_background_jobs():
+    # Runs on the first request (or in warm_up) rather than at import, to keep cold starts
+    # cheap: replay rewrites the job log and may start the worker, the sweep arms a timer.
+    global _background_jobs_started
+    if _background_jobs_started:
+        return
+    with _background_jobs_lock:
+        # Other first requests wait here, so none can enqueue a job while replay compacts the log.
+        if not _background_jobs_started:
+            storage_jobs.replay()
+            _schedule_orphan_sweep()
+            _background_jobs_started = True
 
-    except Exception as e:
-        # Log detailed error including filename if available
-        log_filename = filename if filename else f"unknown (URL: {image_url})"
-        app.logger.error(f"Exception in delete_from_supabase_storage for '{log_filename}' from bucket '{bucket_name}'. Type: {type(e).__name__}. Error: {str(e)}. Traceback: {traceback.format_exc()}")
-        return False
 
 class User(UserMixin):
     def __init__(self, id, username, password_hash, name, role):
@@ -148,45 +2870,72 @@ class User(UserMixin):
         return check_password_hash(self.password_hash, password)
 
 
+USER_COLUMNS = "id, username, password_hash, name, role"
+
+# Session users are loaded on every authenticated request; keep them in memory.
+user_cache = TTLCache(
+    "users",
+    ttl=float(os.getenv("USER_CACHE_TTL", "300")),
+    maxsize=int(os.getenv("USER_CACHE_MAXSIZE", "256")),
+)
+
+
+def invalidate_user(user_id=None):
+    # Call after a user's row changes (setup, role or password changes).
+    user_cache.invalidate(None if user_id is None else int(user_id))
+
+
 @login_manager.user_loader
 def load_user(user_id):
+    def load():
+        resp = supabase.table("users").select(USER_COLUMNS).eq("id", int(user_id)).single().execute()
+        if not resp.data:
+            return None
+        user = resp.data
+        return User(
+            id=user["id"],
+            username=user["username"],
+            password_hash=user["password_hash"],
+            name=user["name"],
+            role=user["role"],
+        )
+
     try:
-        resp = supabase.table("users").select("*").eq("id", int(user_id)).single().execute()
-        if resp.data:
-            user = resp.data
-            return User(
-                id=user["id"],
-                username=user["username"],
-                password_hash=user["password_hash"],
-                name=user["name"],
-                role=user["role"],
-            )
+        return user_cache.get_or_load(int(user_id), load)
     except Exception:
         pass
     return None
 
 
+def get_homepage_feeds():
+    """(bulletins, news), loaded once per request: the ETag and the view both need them."""
+    if "homepage_feeds" in g:
+        return g.homepage_feeds
+    if feed_cache.has("bulletin_posts") and feed_cache.has("news_posts"):
+        # Both in memory: a pool round trip would cost more than the lookups.
+        g.homepage_feeds = get_active_feed("bulletin_posts"), get_active_feed("news_posts")
+        return g.homepage_feeds
+    results = (
+        QueryBatch()
+        .add("bulletins", lambda: get_active_feed("bulletin_posts"))
+        .add("news", lambda: get_active_feed("news_posts"))
+        .run()
+    )
+    for result in results.values():
+        if not result.ok:
+            # The feed cache already fell back to any last-known-good copy. Rendering empty
+            # sections instead would give them an ETag and a response_cache entry.
+            if isinstance(result.error, CircuitOpenError):
+                raise result.error
+            abort(503)
+    g.homepage_feeds = results["bulletins"].value, results["news"].value
+    return g.homepage_feeds
+
+
 @app.route("/")
+@cached_response(lambda: content_version(*get_homepage_feeds()))
 def index():
-    bulletins_resp = (
-        supabase.table("bulletin_posts")
-        .select("*, image_url")
-        .eq("is_active", True)
-        .order("date_posted", desc=True)
-        .limit(8)
-        .execute()
-    )
-    news_resp = (
-        supabase.table("news_posts")
-        .select("*, image_url")
-        .eq("is_active", True)
-        .order("date_posted", desc=True)
-        .limit(8)
-        .execute()
-    )
-    bulletins = bulletins_resp.data or []
-    news = news_resp.data or []
-    manila_time = get_manila_time().strftime("%B %d, %Y %I:%M %p")
+    bulletins, news = get_homepage_feeds()
     return render_template("home.html", bulletins=bulletins, news=news)
 
 
@@ -195,6 +2944,174 @@ def admin_redirect():
     return redirect(url_for("admin_login"))
 
 
+# Login throttling: token buckets per client IP and per username are checked before the
+# users lookup, and a semaphore bounds how many password hashes run at once
+LOGIN_THROTTLE = os.getenv("LOGIN_THROTTLE", "memory")  # memory | sqlite | off
+LOGIN_THROTTLE_DB = os.getenv("LOGIN_THROTTLE_DB", os.path.join(tempfile.gettempdir(), "elooc-login-throttle.sqlite3"))
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", "5"))
+LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", "2"))
+LOGIN_HASH_CONCURRENCY = int(os.getenv("LOGIN_HASH_CONCURRENCY", str(os.cpu_count() or 2)))
+LOGIN_HASH_WAIT = float(os.getenv("LOGIN_HASH_WAIT", "2"))
+LOGIN_BUCKET_IDLE = 3600  # a bucket untouched this long has refilled; the SQLite store prunes it
+# Vercel overwrites X-Forwarded-For with the real client address; elsewhere it can be forged
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "1" if os.getenv("VERCEL") else "0") == "1"
+
+
+def refill_bucket(tokens, updated_at, capacity, rate, now):
+    """Take one token from a bucket. Returns (allowed, tokens left, seconds until the next token)."""
+    tokens = min(capacity, tokens + (now - updated_at) * rate)
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / rate
+
+
+class MemoryBucketStore:
+    """Token buckets in this process, LRU-bounded so a spray of usernames can't grow it without limit."""
+
+    name = "memory"
+
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            allowed, tokens, retry_after = refill_bucket(tokens, updated_at, capacity, rate, now)
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SqliteBucketStore:
+    """Token buckets in a SQLite file, shared by every worker process on the host."""
+
+    name = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS login_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")  # serialises the read-modify-write across processes
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM login_buckets WHERE key = ?", (key,)).fetchone()
+            allowed, tokens, retry_after = refill_bucket(*(row or (capacity, now)), capacity, rate, now)
+            conn.execute("INSERT OR REPLACE INTO login_buckets (key, tokens, updated_at) VALUES (?, ?, ?)", (key, tokens, now))
+            if random.random() < 0.01:
+                conn.execute("DELETE FROM login_buckets WHERE updated_at < ?", (now - LOGIN_BUCKET_IDLE,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, retry_after
+
+
+class LoginThrottled(Exception):
+    def __init__(self, reason, retry_after):
+        super().__init__(f"login throttled ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class LoginThrottle:
+    """
+    check() spends a token from the client's IP bucket and from the
+    username's bucket and raises LoginThrottled when either is empty.
+    hashing() holds one of LOGIN_HASH_CONCURRENCY slots while a password
+    hash runs, so a burst of attempts can't take every core.
+    """
+
+    REASONS = ("ip", "username", "busy")
+
+    def __init__(self, store):
+        self.store = store
+        self.hash_slots = threading.BoundedSemaphore(LOGIN_HASH_CONCURRENCY)
+        self.allowed = 0
+        self.rejections = dict.fromkeys(self.REASONS, 0)
+        self._lock = threading.Lock()
+
+    def _reject(self, reason, retry_after):
+        with self._lock:
+            self.rejections[reason] += 1
+        raise LoginThrottled(reason, retry_after)
+
+    def check(self, ip, username):
+        if self.store is not None:
+            now = time.time()
+            for reason, key, capacity, per_minute in (
+                ("ip", f"ip:{ip}", LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE),
+                ("username", f"user:{username.strip().lower()}", LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE),
+            ):
+                allowed, retry_after = self.store.take(key, capacity, per_minute / 60, now)
+                if not allowed:
+                    self._reject(reason, retry_after)
+        with self._lock:
+            self.allowed += 1
+
+    @contextmanager
+    def hashing(self):
+        if not self.hash_slots.acquire(timeout=LOGIN_HASH_WAIT):
+            self._reject("busy", LOGIN_HASH_WAIT)
+        try:
+            yield
+        finally:
+            self.hash_slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "store": self.store.name if self.store is not None else "off",
+                "allowed": self.allowed,
+                "rejections": dict(self.rejections),
+                "hash_concurrency": LOGIN_HASH_CONCURRENCY,
+            }
+
+    def metrics(self):
+        with self._lock:
+            rejections = dict(self.rejections)
+        return "\n".join(
+            ["# HELP elooc_login_rejections_total Login attempts refused by the throttle.",
+             "# TYPE elooc_login_rejections_total counter"]
+            + [f'elooc_login_rejections_total{{reason="{reason}"}} {count}' for reason, count in rejections.items()]
+        )
+
+
+def create_login_bucket_store():
+    if LOGIN_THROTTLE == "off":
+        return None
+    if LOGIN_THROTTLE == "sqlite":
+        return SqliteBucketStore(LOGIN_THROTTLE_DB)
+    if LOGIN_THROTTLE != "memory":
+        raise Exception(f"Unknown LOGIN_THROTTLE {LOGIN_THROTTLE!r}; expected memory, sqlite or off")
+    return MemoryBucketStore()
+
+
+login_throttle = LoginThrottle(create_login_bucket_store())
+
+
+def client_ip():
+    if TRUST_FORWARDED_FOR and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or "unknown"
+
+
 @app.route("/admin/login", methods=["GET", "POST"])
 def admin_login():
     if current_user.is_authenticated:
@@ -205,12 +3122,23 @@ def admin_login():
         password = request.form.get("password")
 
         try:
-            user_resp = supabase.table("users").select("*").eq("username", username).single().execute()
+            login_throttle.check(client_ip(), username or "")
+        except LoginThrottled as e:
+            return login_throttled_response(e)
+
+        try:
+            user_resp = supabase.table("users").select(USER_COLUMNS).eq("username", username).single().execute()
             user = user_resp.data
         except Exception:
             user = None
 
-        if user and check_password_hash(user["password_hash"], password):
+        try:
+            with login_throttle.hashing(), timed("password_hash"):
+                password_ok = bool(user) and check_password_hash(user["password_hash"], password)
+        except LoginThrottled as e:
+            return login_throttled_response(e)
+
+        if password_ok:
             user_obj = User(
                 user["id"],
                 user["username"],
@@ -219,6 +3147,7 @@ def admin_login():
                 user["role"],
             )
             login_user(user_obj)
+            user_cache.set(user_obj.id, user_obj)
             flash("Login successful!", "success")
             next_page = request.args.get("next")
             return redirect(next_page or url_for("admin_dashboard"))
@@ -228,6 +3157,17 @@ def admin_login():
     return render_template("admin/login.html")
 
 
+def login_throttled_response(error):
+    retry_after = max(1, math.ceil(error.retry_after))
+    if error.reason == "busy":
+        flash("The server is busy. Please try again in a moment.", "danger")
+        status = 503
+    else:
+        flash(f"Too many login attempts. Please try again in {retry_after} seconds.", "danger")
+        status = 429
+    return render_template("admin/login.html"), status, {"Retry-After": str(retry_after)}
+
+
 @app.route("/admin/logout")
 @login_required
 def admin_logout():
@@ -239,33 +3179,207 @@ def admin_logout():
 @app.route("/admin/dashboard")
 @login_required
 def admin_dashboard():
-    bulletin_count_resp = supabase.table("bulletin_posts").select("id", count="exact").execute()
-    news_count_resp = supabase.table("news_posts").select("id", count="exact").execute()
-    patch_notes_resp = supabase.table("patch_notes").select("*").order("date", desc=True).execute()
-    system_maintenance_resp = supabase.table("system_maintenance").select("*").order("start_time", desc=True).execute()
+    results = (
+        QueryBatch()
+        .add("bulletin_counts", lambda: content_counters.get("bulletin_posts"))
+        .add("news_counts", lambda: content_counters.get("news_posts"))
+        .add("patch_notes", lambda: supabase.table("patch_notes").select("*").order("date", desc=True).execute().data)
+        .add("system_maintenance", lambda: supabase.table("system_maintenance").select("*").order("start_time", desc=True).execute().data)
+        .run()
+    )
 
-    bulletin_count = bulletin_count_resp.count or 0
-    news_count = news_count_resp.count or 0
-    patch_notes = patch_notes_resp.data or []
-    system_maintenance = system_maintenance_resp.data or []
+    # Counts we couldn't get render as "—" rather than a misleading zero.
+    bulletin_counts = results["bulletin_counts"].value or {"total": "—", "active": "—"}
+    news_counts = results["news_counts"].value or {"total": "—", "active": "—"}
+    patch_notes = results["patch_notes"].value or []
+    system_maintenance = results["system_maintenance"].value or []
 
     return render_template(
         "admin/dashboard.html",
-        bulletin_count=bulletin_count,
-        news_count=news_count,
+        bulletin_count=bulletin_counts["total"],
+        bulletin_active_count=bulletin_counts["active"],
+        news_count=news_counts["total"],
+        news_active_count=news_counts["active"],
         patch_notes=patch_notes,
         system_maintenance=system_maintenance,
     )
 
 
+# Keyset pagination for admin lists
+ADMIN_PAGE_SIZE = int(os.getenv("ADMIN_PAGE_SIZE", "20"))
+ADMIN_MAX_PAGE_SIZE = 100
+ADMIN_LIST_COLUMNS = "id, title, image_url, image_variants, date_posted, is_active"
+
+
+def encode_cursor(row, order_column="date_posted"):
+    raw = json.dumps([row[order_column], row["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        date_posted, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        # Cursors come from the query string and end up inside an or_() filter, so only a
+        # re-serialized timestamp and an integer id are let through.
+        return datetime.fromisoformat(date_posted).isoformat(), int(row_id)
+    except (ValueError, TypeError):
+        return None
+
+
+def get_page_size():
+    try:
+        return max(1, min(int(request.args.get("limit", ADMIN_PAGE_SIZE)), ADMIN_MAX_PAGE_SIZE))
+    except ValueError:
+        return ADMIN_PAGE_SIZE
+
+
+def fetch_keyset_page(
+    table_name, columns, after=None, before=None, page_size=ADMIN_PAGE_SIZE, filters=None, order_column="date_posted"
+):
+    """
+    Fetch one page of rows ordered newest first by (order_column, id).
+    `after` / `before` are decoded cursors; returns (rows, next_cursor, prev_cursor).
+    The cost of a page doesn't depend on how deep into the archive it is.
+    """
+    column = order_column
+    query = supabase.table(table_name).select(columns)
+    for name, value in (filters or {}).items():
+        query = query.eq(name, value)
+    if before:
+        value, row_id = before
+        query = (
+            query.or_(f'{column}.gt."{value}",and({column}.eq."{value}",id.gt.{row_id})')
+            .order(column)
+            .order("id")
+        )
+    else:
+        if after:
+            value, row_id = after
+            query = query.or_(f'{column}.lt."{value}",and({column}.eq."{value}",id.lt.{row_id})')
+        query = query.order(column, desc=True).order("id", desc=True)
+
+    rows = query.limit(page_size + 1).execute().data or []
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if before:
+        rows.reverse()
+
+    if not rows:
+        return rows, None, None
+    next_cursor = encode_cursor(rows[-1], column) if (has_more if not before else True) else None
+    prev_cursor = encode_cursor(rows[0], column) if (has_more if before else after) else None
+    return rows, next_cursor, prev_cursor
+
+
+# Bulk admin operations: one query per operation and one storage call per bucket
+BULK_ACTIONS = ("delete", "activate", "deactivate")
+
+
+def bulk_update_posts(table_name, bucket_name, action, ids):
+    """
+    Apply a bulk action to posts and return per-id results:
+    {id: {"ok": bool, "error": str or None}}.
+    """
+    results = {post_id: {"ok": False, "error": "not found"} for post_id in ids}
+    if not ids:
+        return results
+
+    if action in ("activate", "deactivate"):
+        resp = (
+            supabase.table(table_name)
+            .update({"is_active": action == "activate"})
+            .in_("id", ids)
+            .execute()
+        )
+        for row in resp.data or []:
+            results[row["id"]] = {"ok": True, "error": None}
+            search_index.upsert(table_name, row)
+        # The previous is_active values aren't known here, so recount on the next read.
+        content_counters.mark_stale(table_name)
+        return results
+
+    deleted = supabase.table(table_name).delete().in_("id", ids).execute().data or []
+    # One queued job, and so one batched storage.remove(), for every image in the batch.
+    enqueue_image_deletion([url for row in deleted for url in post_image_urls(row)], bucket_name)
+    drop_image_refs(table_name, [row["id"] for row in deleted])
+    for row in deleted:
+        results[row["id"]] = {"ok": True, "error": None}
+        search_index.remove(table_name, row["id"])
+    content_counters.adjust(
+        table_name, total=-len(deleted), active=-sum(1 for row in deleted if row.get("is_active"))
+    )
+    return results
+
+
+def handle_bulk_request(table_name, bucket_name, list_endpoint):
+    action = request.form.get("action")
+    try:
+        ids = sorted({int(i) for i in request.form.getlist("ids")})
+    except ValueError:
+        ids = None
+    if action not in BULK_ACTIONS or ids is None:
+        error = "Invalid bulk action or ids."
+        if request.accept_mimetypes.best == "application/json":
+            return jsonify({"error": error}), 400
+        flash(error, "danger")
+        return redirect(url_for(list_endpoint))
+
+    try:
+        results = bulk_update_posts(table_name, bucket_name, action, ids)
+    except Exception as e:
+        app.logger.error(f"Bulk {action} on {table_name} failed: {type(e).__name__} - {str(e)}")
+        results = {post_id: {"ok": False, "error": str(e)} for post_id in ids}
+    invalidate_feeds(table_name)
+
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify({"action": action, "results": results})
+
+    succeeded = [post_id for post_id, result in results.items() if result["ok"]]
+    failed = {post_id: result["error"] for post_id, result in results.items() if not result["ok"]}
+    if succeeded:
+        flash(f"{action.capitalize()}d {len(succeeded)} item(s).", "success")
+    for post_id, error in failed.items():
+        flash(f"Item {post_id}: {error}", "danger")
+    return redirect(request.referrer or url_for(list_endpoint))
+
+
 # Bulletin Management
 
 @app.route("/admin/bulletins")
 @login_required
 def admin_bulletins():
-    bulletins_resp = supabase.table("bulletin_posts").select("*, image_url").order("date_posted", desc=True).execute()
-    bulletins = bulletins_resp.data or []
-    return render_template("admin/bulletins/index.html", bulletins=bulletins)
+    query = request.args.get("q", "").strip()
+    if query:
+        return render_template(
+            "admin/bulletins/index.html",
+            bulletins=PostView.from_rows(
+                search_index.search(query, tables=("bulletin_posts",), active_only=False, limit=ADMIN_MAX_PAGE_SIZE)
+            ),
+            next_cursor=None,
+            prev_cursor=None,
+            query=query,
+        )
+    bulletins, next_cursor, prev_cursor = fetch_keyset_page(
+        "bulletin_posts",
+        ADMIN_LIST_COLUMNS,
+        after=decode_cursor(request.args.get("after")),
+        before=decode_cursor(request.args.get("before")),
+        page_size=get_page_size(),
+    )
+    return render_template(
+        "admin/bulletins/index.html",
+        bulletins=PostView.from_rows(bulletins),
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+    )
+
+
+@app.route("/admin/bulletins/bulk", methods=["POST"])
+@login_required
+def admin_bulk_bulletins():
+    return handle_bulk_request("bulletin_posts", "bulletin-images", "admin_bulletins")
 
 
 @app.route("/admin/bulletins/create", methods=["GET", "POST"])
@@ -277,14 +3391,17 @@ def admin_create_bulletin():
         is_active = bool(request.form.get("is_active"))
         image_file = request.files.get("image")
         image_url = None
+        image_variants = None
 
         if image_file and image_file.filename: # Check if a file was provided
-            image_url = upload_to_supabase_storage(image_file, "bulletin-images")
+            upload_error = validate_upload(image_file)
+            if upload_error:
+                flash(upload_error, "danger")
+                return render_template("admin/bulletins/create.html")
+            image_url, image_variants = upload_image_with_variants(image_file)
             if image_url is None: # Check if upload failed
                 flash("Image upload failed. Please try again.", "danger")
                 return render_template("admin/bulletins/create.html")
-        else:
-            image_url = None
 
 
         data = {
@@ -296,8 +3413,15 @@ def admin_create_bulletin():
         }
         if image_url: # Only include image_url if it's not None
             data["image_url"] = image_url
+        if image_variants:
+            data["image_variants"] = image_variants
 
-        supabase.table("bulletin_posts").insert(data).execute()
+        resp = supabase.table("bulletin_posts").insert(data).execute()
+        invalidate_feeds("bulletin_posts")
+        for row in resp.data or []:
+            search_index.upsert("bulletin_posts", row)
+            update_image_refs("bulletin_posts", row["id"], [], post_image_urls(row))
+        content_counters.adjust("bulletin_posts", total=1, active=1 if is_active else 0)
 
         flash("Bulletin created successfully!", "success")
         return redirect(url_for("admin_bulletins"))
@@ -331,33 +3455,32 @@ def admin_edit_bulletin(id):
         remove_image = request.form.get("remove_image") == "true"
 
         current_db_image_url = bulletin_from_db.get("image_url")
+        current_db_image_variants = bulletin_from_db.get("image_variants")
         new_image_url_to_set = current_db_image_url
+        new_image_variants_to_set = current_db_image_variants
+
+        stale_image_urls = [] # Old images are only removed once the row no longer references them
 
         # Image handling logic
         if remove_image:
-            if current_db_image_url:
-                if not delete_from_supabase_storage(current_db_image_url, "bulletin-images"):
-                    flash("Failed to delete the current image. Item not updated.", "danger")
-                    # form_data_for_template['image_url'] is already current_db_image_url
-                    return render_template("admin/bulletins/edit.html", bulletin=form_data_for_template)
-                new_image_url_to_set = None
-            else: # No image to remove
-                new_image_url_to_set = None
+            stale_image_urls = post_image_urls(bulletin_from_db)
+            new_image_url_to_set = None
+            new_image_variants_to_set = None
         elif image_file and image_file.filename: # Check filename to ensure a file was actually uploaded
-            if current_db_image_url:
-                if not delete_from_supabase_storage(current_db_image_url, "bulletin-images"):
-                    flash("Failed to delete old image before uploading new. Item not updated.", "danger")
-                    # form_data_for_template['image_url'] is already current_db_image_url
-                    return render_template("admin/bulletins/edit.html", bulletin=form_data_for_template)
+            upload_error = validate_upload(image_file)
+            if upload_error:
+                flash(upload_error, "danger")
+                return render_template("admin/bulletins/edit.html", bulletin=form_data_for_template)
 
-            uploaded_image_url = upload_to_supabase_storage(image_file, "bulletin-images")
+            uploaded_image_url, new_image_variants_to_set = upload_image_with_variants(image_file)
             if not uploaded_image_url:
                 flash("New image upload failed. Item not updated.", "danger")
-                # form_data_for_template['image_url'] is already current_db_image_url
                 return render_template("admin/bulletins/edit.html", bulletin=form_data_for_template)
+            stale_image_urls = post_image_urls(bulletin_from_db)
             new_image_url_to_set = uploaded_image_url
 
         form_data_for_template["image_url"] = new_image_url_to_set
+        form_data_for_template["image_variants"] = new_image_variants_to_set
 
         # Prepare data for DB update
         update_data_for_db = {
@@ -368,6 +3491,7 @@ def admin_edit_bulletin(id):
 
         if new_image_url_to_set != current_db_image_url:
             update_data_for_db["image_url"] = new_image_url_to_set
+            update_data_for_db["image_variants"] = new_image_variants_to_set
 
         # Database operation
         if not update_data_for_db and new_image_url_to_set == current_db_image_url : # Check if there's anything to update
@@ -383,6 +3507,11 @@ def admin_edit_bulletin(id):
                  flash(f"Database update failed: {response.error.message}", "danger")
                  return render_template("admin/bulletins/edit.html", bulletin=form_data_for_template)
 
+            invalidate_feeds("bulletin_posts")
+            content_counters.adjust("bulletin_posts", active=int(form_data_for_template["is_active"]) - int(bool(bulletin_from_db.get("is_active"))))
+            search_index.upsert("bulletin_posts", {**bulletin_from_db, **update_data_for_db})
+            enqueue_image_deletion(stale_image_urls, "bulletin-images")
+            update_image_refs("bulletin_posts", id, post_image_urls(bulletin_from_db), post_image_urls(form_data_for_template))
             flash("Bulletin updated successfully!", "success")
             return redirect(url_for("admin_bulletins"))
         except Exception as e:
@@ -397,14 +3526,14 @@ def admin_edit_bulletin(id):
 @app.route("/admin/bulletins/delete/<int:id>", methods=["POST"])
 @login_required
 def admin_delete_bulletin(id):
-    # Fetch the bulletin to get its image_url before deleting
-    resp = supabase.table("bulletin_posts").select("image_url").eq("id", id).single().execute()
-    bulletin_data = resp.data
-
-    if bulletin_data and bulletin_data.get("image_url"):
-        delete_from_supabase_storage(bulletin_data["image_url"], "bulletin-images")
-
-    supabase.table("bulletin_posts").delete().eq("id", id).execute()
+    # The delete returns the removed row, so its images can be queued for removal
+    resp = supabase.table("bulletin_posts").delete().eq("id", id).execute()
+    for bulletin_data in resp.data or []:
+        content_counters.adjust("bulletin_posts", total=-1, active=-1 if bulletin_data.get("is_active") else 0)
+        search_index.remove("bulletin_posts", bulletin_data["id"])
+        enqueue_image_deletion(post_image_urls(bulletin_data), "bulletin-images")
+        drop_image_refs("bulletin_posts", [bulletin_data["id"]])
+    invalidate_feeds("bulletin_posts")
     flash("Bulletin deleted successfully!", "success")
     return redirect(url_for("admin_bulletins"))
 
@@ -414,9 +3543,36 @@ def admin_delete_bulletin(id):
 @app.route("/admin/news")
 @login_required
 def admin_news():
-    news_resp = supabase.table("news_posts").select("*, image_url").order("date_posted", desc=True).execute()
-    news_items = news_resp.data or []
-    return render_template("admin/news/index.html", news_items=news_items)
+    query = request.args.get("q", "").strip()
+    if query:
+        return render_template(
+            "admin/news/index.html",
+            news_items=PostView.from_rows(
+                search_index.search(query, tables=("news_posts",), active_only=False, limit=ADMIN_MAX_PAGE_SIZE)
+            ),
+            next_cursor=None,
+            prev_cursor=None,
+            query=query,
+        )
+    news_items, next_cursor, prev_cursor = fetch_keyset_page(
+        "news_posts",
+        ADMIN_LIST_COLUMNS,
+        after=decode_cursor(request.args.get("after")),
+        before=decode_cursor(request.args.get("before")),
+        page_size=get_page_size(),
+    )
+    return render_template(
+        "admin/news/index.html",
+        news_items=PostView.from_rows(news_items),
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+    )
+
+
+@app.route("/admin/news/bulk", methods=["POST"])
+@login_required
+def admin_bulk_news():
+    return handle_bulk_request("news_posts", "news-and-events-images", "admin_news")
 
 
 @app.route("/admin/news/create", methods=["GET", "POST"])
@@ -428,14 +3584,17 @@ def admin_create_news():
         is_active = bool(request.form.get("is_active"))
         image_file = request.files.get("image")
         image_url = None
+        image_variants = None
 
         if image_file and image_file.filename: # Check if a file was provided
-            image_url = upload_to_supabase_storage(image_file, "news-and-events-images")
+            upload_error = validate_upload(image_file)
+            if upload_error:
+                flash(upload_error, "danger")
+                return render_template("admin/news/create.html")
+            image_url, image_variants = upload_image_with_variants(image_file)
             if image_url is None: # Check if upload failed
                 flash("Image upload failed. Please try again.", "danger")
                 return render_template("admin/news/create.html")
-        else:
-            image_url = None
 
         data = {
             "title": title,
@@ -446,8 +3605,15 @@ def admin_create_news():
         }
         if image_url: # Only include image_url if it's not None
             data["image_url"] = image_url
+        if image_variants:
+            data["image_variants"] = image_variants
 
-        supabase.table("news_posts").insert(data).execute()
+        resp = supabase.table("news_posts").insert(data).execute()
+        invalidate_feeds("news_posts")
+        for row in resp.data or []:
+            search_index.upsert("news_posts", row)
+            update_image_refs("news_posts", row["id"], [], post_image_urls(row))
+        content_counters.adjust("news_posts", total=1, active=1 if is_active else 0)
 
         flash("News item created successfully!", "success")
         return redirect(url_for("admin_news"))
@@ -481,30 +3647,32 @@ def admin_edit_news(id):
         remove_image = request.form.get("remove_image") == "true"
 
         current_db_image_url = news_from_db.get("image_url")
+        current_db_image_variants = news_from_db.get("image_variants")
         new_image_url_to_set = current_db_image_url
+        new_image_variants_to_set = current_db_image_variants
+
+        stale_image_urls = [] # Old images are only removed once the row no longer references them
 
         # Image handling logic
         if remove_image:
-            if current_db_image_url:
-                if not delete_from_supabase_storage(current_db_image_url, "news-and-events-images"):
-                    flash("Failed to delete the current image. Item not updated.", "danger")
-                    return render_template("admin/news/edit.html", news=form_data_for_template)
-                new_image_url_to_set = None
-            else: # No image to remove
-                new_image_url_to_set = None
+            stale_image_urls = post_image_urls(news_from_db)
+            new_image_url_to_set = None
+            new_image_variants_to_set = None
         elif image_file and image_file.filename: # Check filename to ensure a file was actually uploaded
-            if current_db_image_url:
-                if not delete_from_supabase_storage(current_db_image_url, "news-and-events-images"):
-                    flash("Failed to delete old image before uploading new. Item not updated.", "danger")
-                    return render_template("admin/news/edit.html", news=form_data_for_template)
+            upload_error = validate_upload(image_file)
+            if upload_error:
+                flash(upload_error, "danger")
+                return render_template("admin/news/edit.html", news=form_data_for_template)
 
-            uploaded_image_url = upload_to_supabase_storage(image_file, "news-and-events-images")
+            uploaded_image_url, new_image_variants_to_set = upload_image_with_variants(image_file)
             if not uploaded_image_url:
                 flash("New image upload failed. Item not updated.", "danger")
                 return render_template("admin/news/edit.html", news=form_data_for_template)
+            stale_image_urls = post_image_urls(news_from_db)
             new_image_url_to_set = uploaded_image_url
 
         form_data_for_template["image_url"] = new_image_url_to_set
+        form_data_for_template["image_variants"] = new_image_variants_to_set
 
         # Prepare data for DB update
         update_data_for_db = {
@@ -515,6 +3683,7 @@ def admin_edit_news(id):
 
         if new_image_url_to_set != current_db_image_url:
             update_data_for_db["image_url"] = new_image_url_to_set
+            update_data_for_db["image_variants"] = new_image_variants_to_set
 
         # Database operation
         if not update_data_for_db and new_image_url_to_set == current_db_image_url: # Check if there's anything to update
@@ -528,6 +3697,11 @@ def admin_edit_news(id):
                  flash(f"Database update failed: {response.error.message}", "danger")
                  return render_template("admin/news/edit.html", news=form_data_for_template)
 
+            invalidate_feeds("news_posts")
+            content_counters.adjust("news_posts", active=int(form_data_for_template["is_active"]) - int(bool(news_from_db.get("is_active"))))
+            search_index.upsert("news_posts", {**news_from_db, **update_data_for_db})
+            enqueue_image_deletion(stale_image_urls, "news-and-events-images")
+            update_image_refs("news_posts", id, post_image_urls(news_from_db), post_image_urls(form_data_for_template))
             flash("News & Events updated successfully!", "success")
             return redirect(url_for("admin_news"))
         except Exception as e:
@@ -542,14 +3716,14 @@ def admin_edit_news(id):
 @app.route("/admin/news/delete/<int:id>", methods=["POST"])
 @login_required
 def admin_delete_news(id):
-    # Fetch the news item to get its image_url before deleting
-    resp = supabase.table("news_posts").select("image_url").eq("id", id).single().execute()
-    news_data = resp.data
-
-    if news_data and news_data.get("image_url"):
-        delete_from_supabase_storage(news_data["image_url"], "news-and-events-images")
-
-    supabase.table("news_posts").delete().eq("id", id).execute()
+    # The delete returns the removed row, so its images can be queued for removal
+    resp = supabase.table("news_posts").delete().eq("id", id).execute()
+    for news_data in resp.data or []:
+        content_counters.adjust("news_posts", total=-1, active=-1 if news_data.get("is_active") else 0)
+        search_index.remove("news_posts", news_data["id"])
+        enqueue_image_deletion(post_image_urls(news_data), "news-and-events-images")
+        drop_image_refs("news_posts", [news_data["id"]])
+    invalidate_feeds("news_posts")
     flash("News item deleted successfully!", "success")
     return redirect(url_for("admin_news"))
 
@@ -609,45 +3783,239 @@ def get_all_system_maintenance():
 @login_required # Assuming only logged-in admins should access this
 def get_latest_system_maintenance():
     try:
-        now = datetime.now(pytz.utc).isoformat() # Ensure timezone aware comparison
-        # Fetches the most recent maintenance message that is currently active or upcoming.
-        # Orders by start_time descending to get the latest if multiple fit criteria.
-        response = (
-            supabase.table("system_maintenance")
-            .select("*")
-            .lte("start_time", now) # Maintenance should have started
-            .gte("end_time", now)   # And not yet ended
-            .order("start_time", desc=True)
-            .limit(1)
-            .single()
-            .execute()
+        status = get_status_snapshot()
+        now = time.time()
+        # The currently active window wins; otherwise the next upcoming one.
+        return jsonify(status.active(now) or status.upcoming(now)), 200
+    except Exception as e:
+        app.logger.error(f"Exception in get_latest_system_maintenance: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+# Combined status for the admin layout: one request, served from memory, 304 when unchanged
+@app.route("/api/status", methods=["GET"])
+@login_required
+def get_admin_status():
+    try:
+        status = get_status_snapshot()
+    except Exception as e:
+        app.logger.error(f"Exception in get_admin_status: {str(e)}")
+        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+
+    payload = build_status_payload(status, time.time())
+    # The ETag covers what is shown right now, so it also changes when a window opens or closes.
+    etag = content_version(payload)
+    resp = jsonify(payload)
+    resp.set_etag(etag)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
+@app.route("/api/events", methods=["GET"])
+@login_required
+def stream_admin_events():
+    """
+    Server-Sent Events stream of the admin status. Each event's id is a
+    digest of the status it carries, so a reconnect with Last-Event-ID only
+    receives an event if something changed while the client was away.
+    Only served with STATUS_EVENTS=1.
+    """
+    if not STATUS_EVENTS:
+        abort(404)
+    ensure_status_publisher()
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+
+    def stream():
+        sent_id = last_event_id
+        seen = status_events.sequence
+        deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+        status_events.subscribe()
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                try:
+                    payload = build_status_payload(get_status_snapshot(), time.time())
+                    event_id = content_version(payload)
+                    if event_id != sent_id:
+                        sent_id = event_id
+                        yield f"id: {event_id}\nevent: status\ndata: {json.dumps(payload, default=str)}\n\n"
+                except Exception as e:
+                    app.logger.error(f"Error building status event: {type(e).__name__} - {str(e)}")
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return  # the browser reconnects after `retry` ms with Last-Event-ID
+                sequence = status_events.wait(seen, min(SSE_HEARTBEAT_INTERVAL, remaining))
+                if sequence == seen:
+                    # Also re-evaluates time-based changes (a window opening or closing).
+                    yield ": heartbeat\n\n"
+                else:
+                    seen = sequence
+                    time.sleep(SSE_COALESCE_WINDOW)
+        finally:
+            status_events.unsubscribe()
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# Public search over active bulletins and news, answered from the in-memory index
+SEARCH_TYPES = {"bulletins": "bulletin_posts", "news": "news_posts"}
+
+
+@app.route("/api/search", methods=["GET"])
+def search_posts():
+    query = request.args.get("q", "").strip()
+    post_type = request.args.get("type")
+    if post_type and post_type not in SEARCH_TYPES:
+        return jsonify({"error": f"Unknown type {post_type!r}"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", 10)), 1), ADMIN_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = 10
+    tables = (SEARCH_TYPES[post_type],) if post_type else None
+    results = search_index.search(query, tables=tables, limit=limit) if query else []
+    return jsonify({"query": query, "results": results})
+
+
+@app.route("/admin/metrics", methods=["GET"])
+def admin_metrics():
+    bearer = request.headers.get("Authorization", "")
+    token_ok = bool(METRICS_TOKEN) and hmac.compare_digest(bearer, f"Bearer {METRICS_TOKEN}")
+    if not token_ok and not current_user.is_authenticated:
+        return login_manager.unauthorized()
+    startup = [
+        "# HELP elooc_startup_phase_seconds Time spent in each module initialisation phase.",
+        "# TYPE elooc_startup_phase_seconds gauge",
+    ] + [f'elooc_startup_phase_seconds{{phase="{phase}"}} {seconds:.6f}' for phase, seconds in startup_phases.items()]
+    body = "\n".join(
+        (
+            request_histogram.render(),
+            operation_histogram.render(),
+            transport_metrics(),
+            login_throttle.metrics(),
+            "\n".join(startup),
         )
+    ) + "\n"
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
-        # If no active maintenance, try to find the next upcoming one
-        if not response.data and not getattr(response, 'error', None):
-            response = (
-                supabase.table("system_maintenance")
-                .select("*")
-                .gt("start_time", now) # Future start time
-                .order("start_time", desc=False) # Ascending to get the soonest
-                .limit(1)
-                .single()
-                .execute()
-            )
 
-        if response.data:
-            return jsonify(response.data)
-        else:
-            if getattr(response, 'error', None):
-                app.logger.error(f"Error fetching latest system maintenance: {response.error}")
-                # Distinguish between "not found" and actual errors if possible,
-                # but .single() can make this tricky. For now, a generic error.
-                return jsonify({"error": "Failed to fetch latest system maintenance", "details": str(response.error)}), 500
-            return jsonify(None), 200 # Return 200 with null body if no relevant maintenance message exists
+# Public feeds: JSON, RSS and Atom for aggregators, the barangay page tooling and apps
+PUBLIC_FEEDS = {
+    "bulletins": {"table": "bulletin_posts", "title": "Bulletin Board", "anchor": "bulletin"},
+    "news": {"table": "news_posts", "title": "News and Events", "anchor": "news"},
+}
+PUBLIC_FEED_COLUMNS = "id, title, content, image_url, image_variants, date_posted"
+PUBLIC_FEED_MAX_AGE = int(os.getenv("PUBLIC_FEED_MAX_AGE", "60"))
+PUBLIC_FEED_MIMETYPES = {"rss": "application/rss+xml", "atom": "application/atom+xml"}
+
+
+def get_public_page(feed):
+    """The active-only page of a public feed selected by the request's after/limit args."""
+    table_name = PUBLIC_FEEDS[feed]["table"]
+    after = decode_cursor(request.args.get("after"))
+    page_size = get_page_size()
+
+    def load():
+        rows, next_cursor, _ = fetch_keyset_page(
+            table_name, PUBLIC_FEED_COLUMNS, after=after, page_size=page_size, filters={"is_active": True}
+        )
+        return PostView.from_rows(rows), next_cursor
+
+    return public_page_cache.get_or_load((table_name, after, page_size), load)
+
+
+def public_feed_version():
+    # The query args are part of the version: `limit` shows up in the next-page link.
+    return content_version(request.args.to_dict(), *get_public_page(request.view_args["feed"]))
 
+
+def public_post_url(feed, post):
+    return url_for("index", _external=True, _anchor=f"{PUBLIC_FEEDS[feed]['anchor']}-{post.id}")
+
+
+def next_page_url(next_cursor, **values):
+    if not next_cursor:
+        return None
+    if "limit" in request.args:
+        values["limit"] = request.args["limit"]
+    return url_for(request.endpoint, after=next_cursor, _external=True, **values)
+
+
+def public_post(feed, post):
+    return {
+        "id": post.id,
+        "title": post.title,
+        "content": post.content,
+        "date_posted": post.posted_at.isoformat() if post.posted_at else None,
+        "image_url": urljoin(request.host_url, post.image_url) if post.image_url else None,
+        "image_variants": post.image_variants or {},
+        "url": public_post_url(feed, post),
+    }
+
+
+@app.route("/api/<any(bulletins, news):feed>", methods=["GET"])
+@cached_response(public_feed_version, max_age=PUBLIC_FEED_MAX_AGE)
+def public_feed_json(feed):
+    posts, next_cursor = get_public_page(feed)
+    return jsonify({
+        "items": [public_post(feed, post) for post in posts],
+        "next_cursor": next_cursor,
+        "next": next_page_url(next_cursor, feed=feed),
+    })
+
+
+@app.route("/feeds/<any(bulletins, news):feed>.<any(rss, atom):fmt>", methods=["GET"])
+@cached_response(public_feed_version, max_age=PUBLIC_FEED_MAX_AGE)
+def public_feed_xml(feed, fmt):
+    posts, next_cursor = get_public_page(feed)
+    body = render_template(
+        f"feeds/{fmt}.xml",
+        feed=feed,
+        title=f"E-Looc - {PUBLIC_FEEDS[feed]['title']}",
+        posts=[(post, public_post_url(feed, post)) for post in posts],
+        home_url=url_for("index", _external=True, _anchor=PUBLIC_FEEDS[feed]["anchor"]),
+        self_url=request.url,
+        next_url=next_page_url(next_cursor, feed=feed, fmt=fmt),
+        updated=max((post.posted_at for post in posts if post.posted_at), default=get_manila_time()),
+    )
+    return Response(body, mimetype=PUBLIC_FEED_MIMETYPES[fmt])
+
+
+# Cache statistics, so we can confirm hot pages are served from memory
+@app.route("/api/cache-stats", methods=["GET"])
+@login_required
+def get_cache_stats():
+    return jsonify({
+        "feeds": feed_cache.stats(),
+        "public_pages": public_page_cache.stats(),
+        "users": user_cache.stats(),
+        "responses": response_cache.stats(),
+        "status": status_cache.stats(),
+        "counters": content_counters.stats(),
+        "search": search_index.stats(),
+        "transport": {"db": db_transport.stats(), "storage": storage_transport.stats()},
+        "login_throttle": login_throttle.stats(),
+        "intake": dict(intake_stats),
+        "images": {**content_store_stats(), "bucket": IMAGE_CONTENT_BUCKET},
+        "geo": {"reports": report_geo_index.stats(), "boundary": get_boundary().stats() if get_boundary() else None},
+    })
+
+@app.route("/api/storage-jobs", methods=["GET"])
+@login_required
+def get_storage_job_stats():
+    return jsonify(storage_jobs.stats())
+
+@app.route("/admin/storage/sweep", methods=["POST"])
+@login_required
+def admin_sweep_orphaned_images():
+    try:
+        summary = sweep_orphaned_images()
     except Exception as e:
-        app.logger.error(f"Exception in get_latest_system_maintenance: {str(e)}")
-        return jsonify({"error": "An unexpected error occurred", "details": str(e)}), 500
+        app.logger.error(f"Orphan sweep failed: {type(e).__name__} - {str(e)}")
+        return jsonify({"error": "Orphan sweep failed", "details": str(e)}), 500
+    return jsonify({"queued": summary, "jobs": storage_jobs.stats()})
 
 # Setup initial admin user
 
@@ -678,6 +4046,7 @@ def setup():
         }
 
         supabase.table("users").insert(data).execute()
+        invalidate_user()
 
         flash("Initial setup completed. You can now log in.", "success")
         return redirect(url_for("admin_login"))
@@ -685,33 +4054,46 @@ def setup():
     return render_template("admin/setup.html")
 
 
+@app.errorhandler(413)
+def request_entity_too_large(error):
+    flash(f"Upload is too large. The maximum size is {MAX_UPLOAD_SIZE // (1024 * 1024)} MB.", "danger")
+    return redirect(request.url)
+
 @app.errorhandler(500)
 def internal_error(error):
     return f"500 error: {error}", 500
 
+@app.errorhandler(CircuitOpenError)
+def backend_unavailable(error):
+    # Raised when a read has no last-known-good copy to fall back on while the breaker is open
+    retry_after = {"Retry-After": str(int(BREAKER_RESET_TIMEOUT))}
+    if request.path.startswith("/api/"):
+        return jsonify({"error": "Service temporarily unavailable, please retry shortly."}), 503, retry_after
+    return "Service temporarily unavailable, please retry shortly.", 503, retry_after
+
 @app.template_filter("datetimeformat")
-def datetimeformat(value, format="%B %d, %Y %I:%M %p"):
+def datetimeformat(value, format=DISPLAY_DATETIME_FORMAT):
     """
     Convert an ISO‑8601 string or datetime into Asia/Manila time,
-    then format it for display.
+    then format it for display. Posts carry a preformatted date_display;
+    this is for the remaining one-off timestamps.
     """
-    manila = pytz.timezone("Asia/Manila")
-    # Accept either str or datetime
+    if not value:
+        return ""
+    # Strings go through the memoized parser/formatter
     if isinstance(value, str):
-        dt = parser.isoparse(value)
-    else:
-        dt = value
+        return format_timestamp(value, format)
     # Ensure timezone‑aware, then convert
-    if dt.tzinfo is None:
-        dt = manila.localize(dt)
-    dt = dt.astimezone(manila)
-    return dt.strftime(format)
+    dt = value if value.tzinfo is not None else value.replace(tzinfo=MANILA_TZ)
+    return dt.astimezone(MANILA_TZ).strftime(format)
 
 @app.route("/credits")
+@cached_response(max_age=300)
 def credit():
     return render_template("credits.html")
 
 @app.route("/about")
+@cached_response(max_age=300)
 def about():
     return render_template("about.html")
 #@app.route("/credits/alden_richards")
@@ -719,23 +4101,722 @@ def about():
     #return  render_template("alden.html")
 
 @app.route("/coming_soon")
+@cached_response(max_age=300)
 def coming_soon():
     return render_template("coming_soon.html")
 
+# Resident intake: certificate, business permit and report submissions. A reference number is
+# only handed out once the row is committed; the unique idempotency_key makes retries harmless.
+INTAKE_STATUSES = ("pending", "processing", "completed", "rejected")
+INTAKE_LIST_COLUMNS = "id, reference, full_name, status, submitted_at"
+# Without an Idempotency-Key, identical submissions from one address only count as a resubmit
+# within the same window; later ones (next month's clearance, a neighbour behind the same NAT) are new.
+INTAKE_RESUBMIT_WINDOW = int(os.getenv("INTAKE_RESUBMIT_WINDOW", "600"))  # seconds
+
+INTAKE_FORMS = OrderedDict([
+    ("certificate", {
+        "table": "certificate_requests",
+        "title": "Barangay Certificate Request",
+        "admin_endpoint": "brgy_certificate_requests",
+        "prefix": "BC",
+        "summary": "certificate_type",
+        "fields": OrderedDict([
+            ("full_name", {"label": "Full name", "max_length": 120}),
+            ("address", {"label": "Address in Barangay Looc"}),
+            ("contact_number", {"label": "Contact number", "max_length": 30}),
+            ("certificate_type", {"label": "Certificate", "choices": OrderedDict([
+                ("barangay_clearance", "Barangay Clearance"),
+                ("cedula", "Cedula (Community Tax Certificate)"),
+                ("indigency", "Certificate of Indigency"),
+                ("residency", "Certificate of Residency"),
+            ])}),
+            ("purpose", {"label": "Purpose", "max_length": 300}),
+        ]),
+    }),
+    ("business_permit", {
+        "table": "business_permit_requests",
+        "title": "Business Permit Request",
+        "admin_endpoint": "business_permit_requests",
+        "prefix": "BP",
+        "summary": "application_type",
+        "fields": OrderedDict([
+            ("full_name", {"label": "Owner's full name", "max_length": 120}),
+            ("contact_number", {"label": "Contact number", "max_length": 30}),
+            ("business_name", {"label": "Business name", "max_length": 150}),
+            ("business_address", {"label": "Business address"}),
+            ("nature_of_business", {"label": "Nature of business", "max_length": 150}),
+            ("application_type", {"label": "Application", "choices": OrderedDict([
+                ("new", "New permit"),
+                ("renewal", "Renewal"),
+            ])}),
+        ]),
+    }),
+    ("report", {
+        "table": "concern_reports",
+        "title": "Report a Concern",
+        "admin_endpoint": "reports_and_concerns",
+        "prefix": "RC",
+        "summary": "category",
+        "list_extra": ("outside_boundary",),
+        "fields": OrderedDict([
+            ("full_name", {"label": "Full name", "max_length": 120}),
+            ("contact_number", {"label": "Contact number (optional)", "max_length": 30, "required": False}),
+            ("category", {"label": "Category", "choices": OrderedDict([
+                ("infrastructure", "Roads and infrastructure"),
+                ("peace_and_order", "Peace and order"),
+                ("sanitation", "Garbage and sanitation"),
+                ("health", "Health"),
+                ("disaster", "Disaster and emergency"),
+                ("other", "Other"),
+            ])}),
+            ("location", {"label": "Location (street, purok or landmark)"}),
+            ("latitude", {"label": "Latitude", "coordinate": True, "required": False}),
+            ("longitude", {"label": "Longitude", "coordinate": True, "required": False}),
+            ("details", {"label": "Details", "max_length": 2000, "multiline": True}),
+        ]),
+    }),
+])
+INTAKE_TABLES = {spec["table"]: kind for kind, spec in INTAKE_FORMS.items()}
+
+
+def validate_intake(kind, data):
+    """Return (cleaned fields, {field: error message})."""
+    cleaned, errors = {}, {}
+    for name, field in INTAKE_FORMS[kind]["fields"].items():
+        value = str(data.get(name) or "").strip()
+        if not value:
+            if field.get("required", True):
+                errors[name] = f"{field['label']} is required."
+            continue
+        if field.get("coordinate"):
+            try:
+                cleaned[name] = float(value)
+            except ValueError:
+                errors[name] = f"{field['label']} must be a number."
+            continue
+        if "choices" in field and value not in field["choices"]:
+            errors[name] = f"Choose a valid {field['label'].lower()}."
+        elif len(value) > field.get("max_length", 200):
+            errors[name] = f"{field['label']} must be at most {field.get('max_length', 200)} characters."
+        cleaned[name] = value
+    if "latitude" in INTAKE_FORMS[kind]["fields"] and not errors.keys() & {"latitude", "longitude"}:
+        given = [name for name in ("latitude", "longitude") if name in cleaned]
+        boundary = get_boundary()
+        if len(given) == 1:
+            errors["latitude"] = "Give both latitude and longitude, or leave both empty."
+        elif given and boundary is not None:
+            # The boundary is hand-traced and approximate, so a point outside it is flagged for
+            # the admin queue rather than rejected; a genuine report near the edge still gets in.
+            cleaned["outside_boundary"] = not boundary.contains(cleaned["latitude"], cleaned["longitude"])
+    return cleaned, errors
+
+
+def new_intake_reference(kind):
+    # e.g. BC-2510-7KQ3MZ: type, year and month, then a random part that is easy to read out
+    token = base64.b32encode(os.urandom(5)).decode()[:6]
+    return f"{INTAKE_FORMS[kind]['prefix']}-{get_manila_time():%y%m}-{token}"
+
+
+class IntakeUnavailable(Exception):
+    """The submission could not be stored; nothing was acknowledged."""
+
+
+intake_counts = TTLCache("intake_counts", ttl=float(os.getenv("INTAKE_COUNTS_TTL", "30")), maxsize=8)
+intake_stats = {"written": 0, "duplicates": 0, "failed": 0}
+intake_stats_lock = threading.Lock()
+
+
+def count_intake(name):
+    with intake_stats_lock:
+        intake_stats[name] += 1
+
+
+def submit_intake(kind, data, idempotency_key):
+    """
+    Validate and store a submission. Returns (reference, errors, duplicate);
+    reference is None when there are validation errors. A resubmission with
+    the same idempotency key gets the stored reference back. Raises
+    IntakeUnavailable if the row could not be written.
+    """
+    cleaned, errors = validate_intake(kind, data)
+    if errors:
+        return None, errors, False
+    if not idempotency_key:
+        # No key from the client: identical content from the same address in the same window
+        # counts as a resubmit.
+        window = int(time.time() // INTAKE_RESUBMIT_WINDOW)
+        fingerprint = json.dumps([kind, cleaned, client_ip(), window], sort_keys=True)
+        idempotency_key = "auto-" + hashlib.sha256(fingerprint.encode()).hexdigest()[:32]
+    idempotency_key = f"{kind}:{idempotency_key[:100]}"
+    table_name = INTAKE_FORMS[kind]["table"]
+    row = {
+        **cleaned,
+        "reference": new_intake_reference(kind),
+        "idempotency_key": idempotency_key,
+        "status": "pending",
+        "submitted_at": get_manila_time().isoformat(),
+    }
+    try:
+        # The row is committed before the reference goes out: a serverless instance can be frozen
+        # or recycled right after responding, so nothing may wait in memory or on local disk.
+        written = (
+            supabase.table(table_name).upsert(row, on_conflict="idempotency_key", ignore_duplicates=True).execute().data
+        )
+        if not written:
+            # ignore_duplicates returns nothing for a key that is already stored; answer with its reference.
+            existing = (
+                supabase.table(table_name).select("reference").eq("idempotency_key", idempotency_key).single().execute().data
+            )
+    except Exception as e:
+        count_intake("failed")
+        app.logger.error(f"Storing a {kind} submission failed: {type(e).__name__} - {str(e)}")
+        raise IntakeUnavailable() from e
+    if not written:
+        count_intake("duplicates")
+        return existing["reference"], {}, True
+    count_intake("written")
+    intake_counts.invalidate(table_name)
+    if kind == "report":
+        report_geo_index.add(written[0])
+    return row["reference"], {}, False
+
+
+def get_intake_counts(kind):
+    """{status: count} for one intake table, cached until its next write."""
+    table_name = INTAKE_FORMS[kind]["table"]
+
+    def load():
+        batch = QueryBatch()
+        for status in INTAKE_STATUSES:
+            batch.add(status, lambda status=status: (
+                supabase.table(table_name).select("id", count="exact", head=True).eq("status", status).execute().count
+            ))
+        return {status: result.value or 0 for status, result in batch.run().items()}
+
+    return intake_counts.get_or_load(table_name, load)
+
+
+@app.route("/services/<any(certificate, business_permit, report):kind>", methods=["GET", "POST"])
+def intake_form(kind):
+    spec = INTAKE_FORMS[kind]
+    if request.method == "POST":
+        try:
+            reference, errors, _ = submit_intake(kind, request.form, request.form.get("idempotency_key"))
+        except IntakeUnavailable:
+            errors = {"_form": "We could not accept your submission right now. Please try again in a few minutes."}
+            reference = None
+        if reference:
+            return render_template("intake_form.html", kind=kind, spec=spec, reference=reference)
+        return render_template(
+            "intake_form.html", kind=kind, spec=spec, errors=errors, values=request.form,
+            idempotency_key=request.form.get("idempotency_key") or uuid.uuid4().hex,
+        ), 503 if "_form" in errors else 400
+    return render_template("intake_form.html", kind=kind, spec=spec, errors={}, values={}, idempotency_key=uuid.uuid4().hex)
+
+
+@app.route("/api/intake/<any(certificate, business_permit, report):kind>", methods=["POST"])
+def intake_api(kind):
+    try:
+        reference, errors, duplicate = submit_intake(
+            kind, request.get_json(silent=True) or {}, request.headers.get("Idempotency-Key")
+        )
+    except IntakeUnavailable:
+        return jsonify({"error": "Submissions are temporarily unavailable."}), 503
+    if errors:
+        return jsonify({"errors": errors}), 400
+    return jsonify({"reference": reference, "status": "pending", "duplicate": duplicate}), 202
+
+
+def render_intake_queue(kind, template, **context):
+    spec = INTAKE_FORMS[kind]
+    summary_choices = spec["fields"][spec["summary"]]["choices"]
+    status = request.args.get("status")
+    summary = request.args.get(spec["summary"])
+    reference = request.args.get("reference", "").strip().upper()
+    filters = {}
+    if status in INTAKE_STATUSES:
+        filters["status"] = status
+    if summary in summary_choices:
+        filters[spec["summary"]] = summary
+    if reference:
+        filters["reference"] = reference
+    # Only the list projection is fetched; the (status, submitted_at, id) index serves every filter combination.
+    submissions, next_cursor, prev_cursor = fetch_keyset_page(
+        spec["table"],
+        ", ".join([INTAKE_LIST_COLUMNS, spec["summary"], *spec.get("list_extra", ())]),
+        after=decode_cursor(request.args.get("after")),
+        before=decode_cursor(request.args.get("before")),
+        page_size=get_page_size(),
+        filters=filters,
+        order_column="submitted_at",
+    )
+    try:
+        counts = get_intake_counts(kind)
+    except Exception as e:
+        app.logger.error(f"Could not count {spec['table']}: {type(e).__name__} - {str(e)}")
+        counts = {}
+    return render_template(
+        template,
+        kind=kind,
+        spec=spec,
+        submissions=submissions,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        counts=counts,
+        statuses=INTAKE_STATUSES,
+        summary_choices=summary_choices,
+        filters={"status": status, spec["summary"]: summary, "reference": reference},
+        page_args={
+            name: value for name, value in request.args.items() if name not in ("after", "before") and value
+        },
+        **context,
+    )
+
+
 @app.route("/admin/brgy_certificate_requests")
 @login_required
 def brgy_certificate_requests():
-    return render_template("admin/brgy_certificate_requests.html")
+    return render_intake_queue("certificate", "admin/brgy_certificate_requests.html")
 
 @app.route("/admin/business_permit_requests")
 @login_required
 def business_permit_requests():
-    return render_template("admin/business_permit_requests.html")
+    return render_intake_queue("business_permit", "admin/business_permit_requests.html")
 
 @app.route("/admin/reports_and_concerns")
 @login_required
 def reports_and_concerns():
-    return render_template("admin/reports_and_concerns.html")
+    return render_intake_queue("report", "admin/reports_and_concerns.html", heatmap_zooms=HEATMAP_ZOOMS)
+
+
+@app.route("/admin/intake/<any(certificate, business_permit, report):kind>/<int:id>", methods=["GET", "POST"])
+@login_required
+def admin_intake_detail(kind, id):
+    spec = INTAKE_FORMS[kind]
+    if request.method == "POST":
+        status = request.form.get("status")
+        if status not in INTAKE_STATUSES:
+            flash("Invalid status.", "danger")
+        else:
+            try:
+                updated = supabase.table(spec["table"]).update({"status": status}).eq("id", id).execute().data or []
+                intake_counts.invalidate(spec["table"])
+                if kind == "report":
+                    for row in updated:
+                        report_geo_index.update_status(row.get("reference"), status)
+                flash(f"Status set to {status}.", "success")
+            except Exception as e:
+                app.logger.error(f"Updating {spec['table']} {id} failed: {type(e).__name__} - {str(e)}")
+                flash("Could not update the status.", "danger")
+        return redirect(url_for("admin_intake_detail", kind=kind, id=id))
+    try:
+        submission = supabase.table(spec["table"]).select("*").eq("id", id).single().execute().data
+    except Exception:
+        flash("Submission not found.", "danger")
+        return redirect(url_for(spec["admin_endpoint"]))
+    return render_template("admin/intake_detail.html", kind=kind, spec=spec, submission=submission, statuses=INTAKE_STATUSES)
+
+# Geo: report locations are checked against the barangay boundary (points outside it are flagged),
+# indexed in a geohash grid for map queries and binned into heatmap tiles as they arrive
+# (no table scans per view)
+GEO_BOUNDARY_PATH = os.getenv("GEO_BOUNDARY_PATH", os.path.join(app.root_path, "static", "looc-boundary.geojson"))
+GEO_GRID_SIZE = 64  # the boundary's bounding box is split into GEO_GRID_SIZE x GEO_GRID_SIZE cells
+GEO_REBUILD_INTERVAL = float(os.getenv("GEO_REBUILD_INTERVAL", "900"))
+GEO_REPORT_COLUMNS = "id, reference, latitude, longitude, category, status, submitted_at"
+GEO_MAX_RESULTS = 2000
+GEO_MAX_RADIUS = 5000  # metres
+GEOHASH_PRECISION = 7  # cells of about 150 x 150 m
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+HEATMAP_ZOOMS = range(13, 19)
+HEATMAP_TILE_SIZE = 256
+HEATMAP_BINS = 32  # per tile side, so one bin is 8 x 8 pixels
+EARTH_RADIUS_M = 6371008.8
+
+
+class BoundaryPolygon:
+    """
+    Point-in-polygon test for the barangay boundary. The bounding box is
+    divided into a grid once; cells no edge passes through are wholly inside
+    or outside, so most lookups are a bounding-box check and one grid read.
+    Only points in cells crossed by an edge fall back to ray casting.
+    """
+    OUTSIDE, INSIDE, EDGE = 0, 1, 2
+
+    def __init__(self, ring, grid_size=GEO_GRID_SIZE):
+        ring = [(float(lon), float(lat)) for lon, lat in ring]
+        if ring[0] == ring[-1]:
+            ring = ring[:-1]
+        self.ring = ring
+        self.edges = list(zip(ring, ring[1:] + ring[:1]))
+        self.min_lon, self.max_lon = min(p[0] for p in ring), max(p[0] for p in ring)
+        self.min_lat, self.max_lat = min(p[1] for p in ring), max(p[1] for p in ring)
+        self.grid_size = grid_size
+        self.cell_width = (self.max_lon - self.min_lon) / grid_size
+        self.cell_height = (self.max_lat - self.min_lat) / grid_size
+        self.grid_hits = 0
+        self.ray_casts = 0
+
+        cells = bytearray(grid_size * grid_size)
+        for (lon1, lat1), (lon2, lat2) in self.edges:
+            # An edge lies inside its own bounding box, so marking every cell that box touches is conservative.
+            x0, y0 = self._cell(min(lon1, lon2), min(lat1, lat2))
+            x1, y1 = self._cell(max(lon1, lon2), max(lat1, lat2))
+            for y in range(y0, y1 + 1):
+                cells[y * grid_size + x0:y * grid_size + x1 + 1] = bytes([self.EDGE]) * (x1 - x0 + 1)
+        for i, state in enumerate(cells):
+            if state != self.EDGE:
+                x, y = i % grid_size, i // grid_size
+                centre_lon = self.min_lon + (x + 0.5) * self.cell_width
+                centre_lat = self.min_lat + (y + 0.5) * self.cell_height
+                cells[i] = self.INSIDE if self._ray_cast(centre_lon, centre_lat) else self.OUTSIDE
+        self.cells = cells
+
+    def _cell(self, lon, lat):
+        x = int((lon - self.min_lon) / self.cell_width) if self.cell_width else 0
+        y = int((lat - self.min_lat) / self.cell_height) if self.cell_height else 0
+        return min(max(x, 0), self.grid_size - 1), min(max(y, 0), self.grid_size - 1)
+
+    def _ray_cast(self, lon, lat):
+        inside = False
+        for (lon1, lat1), (lon2, lat2) in self.edges:
+            if (lat1 > lat) != (lat2 > lat) and lon < lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1):
+                inside = not inside
+        return inside
+
+    def contains(self, lat, lon):
+        if not (self.min_lat <= lat <= self.max_lat and self.min_lon <= lon <= self.max_lon):
+            return False
+        x, y = self._cell(lon, lat)
+        state = self.cells[y * self.grid_size + x]
+        if state != self.EDGE:
+            self.grid_hits += 1
+            return state == self.INSIDE
+        self.ray_casts += 1
+        return self._ray_cast(lon, lat)
+
+    def stats(self):
+        edge_cells = self.cells.count(self.EDGE)
+        return {
+            "vertices": len(self.ring),
+            "edge_cells": edge_cells,
+            "grid_cells": len(self.cells),
+            "grid_hits": self.grid_hits,
+            "ray_casts": self.ray_casts,
+        }
+
+
+@lru_cache(maxsize=1)
+def get_boundary():
+    """The barangay boundary from GEO_BOUNDARY_PATH (GeoJSON), or None if it can't be read."""
+    try:
+        with open(GEO_BOUNDARY_PATH) as f:
+            geometry = json.load(f)
+        if geometry.get("type") == "FeatureCollection":
+            geometry = geometry["features"][0]
+        if geometry.get("type") == "Feature":
+            geometry = geometry["geometry"]
+        rings = geometry["coordinates"] if geometry["type"] == "Polygon" else geometry["coordinates"][0]
+        return BoundaryPolygon(rings[0])  # exterior ring; the barangay has no holes
+    except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+        app.logger.error(f"Could not load the boundary from {GEO_BOUNDARY_PATH}: {type(e).__name__} - {str(e)}")
+        return None
+
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, bit_count, even = [], 0, 0, True
+    while len(chars) < precision:
+        bounds, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = bits * 2 + 1
+            bounds[0] = mid
+        else:
+            bits *= 2
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = bit_count = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision=GEOHASH_PRECISION):
+    """(height, width) of a geohash cell in degrees; longitude gets the extra bit when the bit count is odd."""
+    total_bits = precision * 5
+    return 180.0 / 2 ** (total_bits // 2), 360.0 / 2 ** ((total_bits + 1) // 2)
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def mercator_pixel(lat, lon, zoom):
+    """Global web-mercator pixel coordinates at `zoom` (the same tiling Leaflet and OSM use)."""
+    scale = HEATMAP_TILE_SIZE * 2 ** zoom
+    sin_lat = math.sin(math.radians(lat))
+    return (lon + 180) / 360 * scale, (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+
+
+class ReportGeoIndex:
+    """
+    Concern reports with coordinates, bucketed by geohash cell for viewport
+    and radius queries, plus per-zoom heatmap tiles of report counts that are
+    updated on every add. Loaded from concern_reports on first use and kept
+    current by submit_intake and status changes; a background reload every
+    `rebuild_interval` seconds picks up reports written by other instances.
+    """
+
+    def __init__(self, table_name, rebuild_interval):
+        self.table_name = table_name
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.RLock()
+        self._load_lock = threading.Lock()
+        self._points = {}  # reference -> point
+        self._cells = {}  # geohash -> set of references
+        self._tiles = {}  # (z, x, y) -> {bin: count}
+        self._max_bin = dict.fromkeys(HEATMAP_ZOOMS, 0)
+        self._pending = []
+        self._building = False
+        self._built_at = None
+        self.rebuilds = 0
+        self.queries = 0
+
+    def _add(self, point):
+        reference = point["reference"]
+        existing = self._points.get(reference)
+        if existing:
+            existing.update(status=point["status"], id=point["id"] or existing["id"])
+            return
+        self._points[reference] = point
+        self._cells.setdefault(geohash_encode(point["lat"], point["lon"]), set()).add(reference)
+        bin_size = HEATMAP_TILE_SIZE // HEATMAP_BINS
+        for zoom in HEATMAP_ZOOMS:
+            px, py = mercator_pixel(point["lat"], point["lon"], zoom)
+            bins = self._tiles.setdefault((zoom, int(px // HEATMAP_TILE_SIZE), int(py // HEATMAP_TILE_SIZE)), {})
+            key = int(py % HEATMAP_TILE_SIZE // bin_size) * HEATMAP_BINS + int(px % HEATMAP_TILE_SIZE // bin_size)
+            bins[key] = bins.get(key, 0) + 1
+            self._max_bin[zoom] = max(self._max_bin[zoom], bins[key])
+
+    @staticmethod
+    def point_from_row(row):
+        if row.get("latitude") is None or row.get("longitude") is None or not row.get("reference"):
+            return None
+        return {
+            "id": row.get("id"),
+            "reference": row["reference"],
+            "lat": float(row["latitude"]),
+            "lon": float(row["longitude"]),
+            "category": row.get("category"),
+            "status": row.get("status") or "pending",
+            "submitted_at": row.get("submitted_at"),
+        }
+
+    def add(self, row):
+        """Index a report row; rows without coordinates are ignored. Re-adding a reference only updates it."""
+        point = self.point_from_row(row)
+        if point is None:
+            return
+        with self._lock:
+            if self._building:
+                self._pending.append(point)
+            self._add(point)
+
+    def update_status(self, reference, status):
+        with self._lock:
+            point = self._points.get(reference)
+            if point is None:
+                return
+            point["status"] = status
+            if self._building:
+                self._pending.append(dict(point))
+
+    def ensure_loaded(self):
+        if self._built_at is None:
+            with self._load_lock:
+                if self._built_at is None:
+                    self.rebuild()
+        elif time.time() - self._built_at >= self.rebuild_interval and not self._building:
+            threading.Thread(target=self.rebuild, daemon=True).start()
+
+    def rebuild(self, page_size=1000):
+        with self._lock:
+            if self._building:
+                return
+            self._building = True
+            self._pending = []
+        try:
+            started_at = time.time()
+            fresh = ReportGeoIndex(self.table_name, self.rebuild_interval)
+            start = 0
+            while True:
+                rows = (
+                    supabase.table(self.table_name)
+                    .select(GEO_REPORT_COLUMNS)
+                    .order("id")
+                    .range(start, start + page_size - 1)
+                    .execute()
+                    .data
+                    or []
+                )
+                for row in rows:
+                    point = self.point_from_row(row)
+                    if point is not None:
+                        fresh._add(point)
+                if len(rows) < page_size:
+                    break
+                start += page_size
+        except Exception as e:
+            app.logger.error(f"Geo index rebuild failed: {type(e).__name__} - {str(e)}")
+            with self._lock:
+                self._building = False
+                if self._built_at is None:
+                    # Serve what has been added in this process rather than retrying on every map request.
+                    self._built_at = time.time() - self.rebuild_interval
+            return
+        with self._lock:
+            # Replay writes that raced with the read above.
+            for point in self._pending:
+                fresh._add(point)
+            for attr in ("_points", "_cells", "_tiles", "_max_bin"):
+                setattr(self, attr, getattr(fresh, attr))
+            self._pending = []
+            self._building = False
+            self._built_at = started_at
+            self.rebuilds += 1
+
+    def _cells_covering(self, min_lat, min_lon, max_lat, max_lon):
+        """Geohashes of the cells overlapping the box, or None when there are more than it is worth listing."""
+        height, width = geohash_cell_size()
+        rows = range(math.floor((min_lat + 90) / height), math.floor((max_lat + 90) / height) + 1)
+        columns = range(math.floor((min_lon + 180) / width), math.floor((max_lon + 180) / width) + 1)
+        if len(rows) * len(columns) > max(len(self._cells), 1) * 4:
+            return None
+        return [
+            geohash_encode(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width)
+            for row in rows
+            for column in columns
+        ]
+
+    def _in_box(self, min_lat, min_lon, max_lat, max_lon):
+        with self._lock:
+            self.queries += 1
+            cells = self._cells_covering(min_lat, min_lon, max_lat, max_lon)
+            if cells is None:
+                # Zoomed far out: walking the occupied cells is cheaper than enumerating empty ones.
+                references = self._points.keys()
+            else:
+                references = [reference for cell in cells for reference in self._cells.get(cell, ())]
+            return [
+                dict(point) for point in map(self._points.get, references)
+                if min_lat <= point["lat"] <= max_lat and min_lon <= point["lon"] <= max_lon
+            ]
+
+    def viewport(self, min_lat, min_lon, max_lat, max_lon, limit=GEO_MAX_RESULTS):
+        """Reports inside the box, newest first. Returns (points, truncated)."""
+        self.ensure_loaded()
+        points = self._in_box(min_lat, min_lon, max_lat, max_lon)
+        points.sort(key=lambda point: point["submitted_at"] or "", reverse=True)
+        return points[:limit], len(points) > limit
+
+    def radius(self, lat, lon, radius_m, limit=GEO_MAX_RESULTS):
+        """Reports within `radius_m` metres, nearest first, each with "distance_m". Returns (points, truncated)."""
+        self.ensure_loaded()
+        dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        points = []
+        for point in self._in_box(lat - dlat, lon - dlon, lat + dlat, lon + dlon):
+            point["distance_m"] = round(haversine_m(lat, lon, point["lat"], point["lon"]), 1)
+            if point["distance_m"] <= radius_m:
+                points.append(point)
+        points.sort(key=lambda point: point["distance_m"])
+        return points[:limit], len(points) > limit
+
+    def heatmap_tile(self, zoom, x, y):
+        """{"bins": side length, "max": busiest bin at this zoom, "counts": [[bin, count], ...]} for one tile."""
+        self.ensure_loaded()
+        with self._lock:
+            bins = self._tiles.get((zoom, x, y), {})
+            return {"bins": HEATMAP_BINS, "max": self._max_bin.get(zoom, 0), "counts": sorted(bins.items())}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "points": len(self._points),
+                "cells": len(self._cells),
+                "tiles": len(self._tiles),
+                "built_at": self._built_at,
+                "rebuilds": self.rebuilds,
+                "queries": self.queries,
+            }
+
+
+report_geo_index = ReportGeoIndex(INTAKE_FORMS["report"]["table"], GEO_REBUILD_INTERVAL)
+
+
+def parse_float_args(*names):
+    try:
+        return [float(request.args[name]) for name in names]
+    except (KeyError, ValueError):
+        return None
+
+
+@app.route("/admin/geo/reports")
+@login_required
+def admin_geo_reports():
+    """?bbox=min_lon,min_lat,max_lon,max_lat for a map viewport, or ?lat=&lon=&radius= (metres)."""
+    if "bbox" in request.args:
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(value) for value in request.args["bbox"].split(","))
+        except ValueError:
+            return jsonify({"error": "bbox must be min_lon,min_lat,max_lon,max_lat"}), 400
+        points, truncated = report_geo_index.viewport(min_lat, min_lon, max_lat, max_lon)
+    else:
+        values = parse_float_args("lat", "lon", "radius")
+        if values is None or not 0 < values[2] <= GEO_MAX_RADIUS:
+            return jsonify({"error": f"Give bbox, or lat, lon and a radius of up to {GEO_MAX_RADIUS} m"}), 400
+        points, truncated = report_geo_index.radius(*values)
+    for point in points:
+        point["url"] = url_for("admin_intake_detail", kind="report", id=point["id"]) if point["id"] else None
+    return jsonify({"reports": points, "truncated": truncated})
+
+
+@app.route("/admin/geo/heatmap/<int:z>/<int:x>/<int:y>.json")
+@login_required
+def admin_geo_heatmap(z, x, y):
+    if z not in HEATMAP_ZOOMS:
+        return jsonify({"error": f"Heatmap tiles exist for zoom {HEATMAP_ZOOMS[0]} to {HEATMAP_ZOOMS[-1]}"}), 404
+    resp = jsonify(report_geo_index.heatmap_tile(z, x, y))
+    resp.headers["Cache-Control"] = "private, max-age=30"
+    return resp
+
+# Cold-start mode (the default) defers the Supabase client, heavy imports and template
+# compilation to first use. Long-running servers can set LAZY_INIT=0 to pay for them up front.
+LAZY_INIT = os.getenv("LAZY_INIT", "1") != "0"
+
+
+def warm_up():
+    if isinstance(data_client, LazyClient):
+        data_client.get()
+    for module in (httpx, ImageOps):  # dateutil stays lazy: it is only a parse fallback
+        module.__spec__  # any attribute access executes a lazy module
+    image_variant_formats()
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+    start_background_jobs()
+
+
+mark_startup("app")
+if not LAZY_INIT:
+    warm_up()
+    mark_startup("warm_up")
+app.logger.info(
+    "Startup: " + ", ".join(f"{phase} {seconds * 1000:.0f}ms" for phase, seconds in startup_phases.items())
+)
 
 if __name__ == "__main__":
     # Use 0.0.0.0 to be reachable in local network, change debug to False in production
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# main.py reads its configuration at import time, so the test settings go in first.
+TEST_DIR = tempfile.mkdtemp(prefix="e-looc-tests-")
+os.environ.update(
+    DATA_BACKEND="memory",
+    SECRET_KEY="tests",
+    ORPHAN_SWEEP_INTERVAL="0",
+    LOCAL_STORAGE_DIR=os.path.join(TEST_DIR, "storage"),
+    SEARCH_SNAPSHOT_PATH=os.path.join(TEST_DIR, "search.json.gz"),
+    STORAGE_JOB_LOG=os.path.join(TEST_DIR, "storage-jobs.jsonl"),
+)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh in-memory LocalClient standing in for Supabase."""
+    client = main.LocalClient(":memory:", str(tmp_path / "storage"))
+    monkeypatch.setattr(main, "supabase", client)
+    return client
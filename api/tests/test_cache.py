@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+
+import main
+
+
+def wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.005)
+
+
+class Loader:
+    """Returns the queued values (or raises queued exceptions) in order and counts calls."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_fresh_entries_are_served_without_loading():
+    cache = main.TTLCache("test", ttl=60)
+    loader = Loader("v1", "v2")
+    assert cache.get_or_load("k", loader) == "v1"
+    assert cache.get_or_load("k", loader) == "v1"
+    assert loader.calls == 1
+    assert cache.stats()["hits"] == 1
+
+    cache.invalidate("k")
+    assert cache.get_or_load("k", loader) == "v2"
+    assert loader.calls == 2
+
+
+def test_concurrent_misses_share_one_load():
+    cache = main.TTLCache("test", ttl=60)
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(2)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load("k", loader))) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: cache.stats()["coalesced"] == 19)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["value"] * 20
+
+
+def test_coalesced_callers_see_the_load_error_and_nothing_is_cached():
+    cache = main.TTLCache("test", ttl=60)
+    release = threading.Event()
+
+    def failing():
+        release.wait(2)
+        raise RuntimeError("backend down")
+
+    errors = []
+
+    def call():
+        try:
+            cache.get_or_load("k", failing)
+        except RuntimeError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: cache.stats()["coalesced"] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 5
+    assert not cache.has("k")
+    assert cache.get_or_load("k", Loader("recovered")) == "recovered"
+
+
+def test_stale_entries_are_served_while_refreshing_in_the_background():
+    cache = main.TTLCache("test", ttl=0, stale_ttl=60)
+    loader = Loader("v1", "v2")
+    assert cache.get_or_load("k", loader) == "v1"
+
+    # Past its ttl: the old value comes back at once and a refresh is started.
+    assert cache.get_or_load("k", loader) == "v1"
+    assert cache.stats()["stale_hits"] == 1
+    wait_until(lambda: cache.get_or_load("k", loader) == "v2")
+
+
+def test_failed_refresh_keeps_serving_the_stale_value():
+    cache = main.TTLCache("test", ttl=0, stale_ttl=60)
+    loader = Loader("v1", RuntimeError("backend down"))
+    assert cache.get_or_load("k", loader) == "v1"
+    assert cache.get_or_load("k", loader) == "v1"
+    wait_until(lambda: cache.stats()["refresh_errors"] >= 1)
+    assert cache.get_or_load("k", loader) == "v1"
+
+
+def test_entries_past_the_stale_window_are_reloaded():
+    cache = main.TTLCache("test", ttl=0, stale_ttl=0)
+    loader = Loader("v1", "v2")
+    assert cache.get_or_load("k", loader) == "v1"
+    assert cache.get_or_load("k", loader) == "v2"
+    assert cache.stats()["stale_hits"] == 0
+
+
+def test_last_good_value_survives_invalidate_and_a_failed_load():
+    cache = main.TTLCache("test", ttl=60, last_good=True)
+    assert cache.get_or_load("k", Loader("v1")) == "v1"
+    cache.invalidate()
+
+    assert cache.get_or_load("k", Loader(RuntimeError("backend down"))) == "v1"
+    assert cache.stats()["fallbacks"] == 1
+    # The fallback isn't cached as fresh: the next read tries the backend again.
+    assert cache.get_or_load("k", Loader("v2")) == "v2"
+
+
+def test_failed_load_without_last_good_raises():
+    cache = main.TTLCache("test", ttl=60)
+    with pytest.raises(RuntimeError):
+        cache.get_or_load("k", Loader(RuntimeError("backend down")))
+    with pytest.raises(RuntimeError):
+        main.TTLCache("test", ttl=60, last_good=True).get_or_load("k", Loader(RuntimeError("never loaded")))
+
+
+def test_invalidate_during_a_load_drops_the_pre_write_result():
+    cache = main.TTLCache("test", ttl=60)
+
+    def loader():
+        cache.invalidate("k")  # an admin write lands while the query is in flight
+        return "old"
+
+    assert cache.get_or_load("k", loader) == "old"
+    assert not cache.has("k")
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = main.TTLCache("test", ttl=60, maxsize=2)
+    for key in ("a", "b"):
+        cache.get_or_load(key, Loader(key))
+    cache.get_or_load("a", Loader("unused"))  # touch "a" so "b" is the oldest
+    cache.get_or_load("c", Loader("c"))
+    assert cache.has("a") and cache.has("c") and not cache.has("b")
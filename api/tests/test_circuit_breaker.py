@@ -0,0 +1,118 @@
+import httpx
+import pytest
+
+import main
+
+
+def elapse(breaker):
+    """Move an open breaker's clock past reset_timeout."""
+    breaker.opened_at -= breaker.reset_timeout
+
+
+def open_breaker(threshold=3):
+    breaker = main.CircuitBreaker("test", threshold=threshold, reset_timeout=30)
+    for _ in range(threshold):
+        breaker.before_call()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_threshold_consecutive_failures():
+    breaker = main.CircuitBreaker("test", threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(main.CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()["rejected"] == 1
+    assert breaker.stats()["times_opened"] == 1
+
+
+def test_a_success_resets_the_failure_count():
+    breaker = main.CircuitBreaker("test", threshold=3, reset_timeout=30)
+    for outcome in ("fail", "fail", "ok", "fail", "fail"):
+        breaker.before_call()
+        breaker.record_failure() if outcome == "fail" else breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = open_breaker()
+    elapse(breaker)
+
+    breaker.before_call()  # the probe
+    assert breaker.state == "half_open"
+    with pytest.raises(main.CircuitOpenError):
+        breaker.before_call()  # everyone else waits for its outcome
+
+
+def test_successful_probe_closes_the_breaker():
+    breaker = open_breaker()
+    elapse(breaker)
+    breaker.before_call()
+    breaker.record_success()
+
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    breaker.before_call()
+    breaker.before_call()
+
+
+def test_failed_probe_opens_it_again_for_another_timeout():
+    breaker = open_breaker()
+    elapse(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert breaker.stats()["times_opened"] == 2
+    # The timeout starts over from the failed probe.
+    with pytest.raises(main.CircuitOpenError):
+        breaker.before_call()
+    elapse(breaker)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+
+
+def test_transport_retries_transient_reads_and_trips_the_breaker(monkeypatch):
+    monkeypatch.setattr(main.time, "sleep", lambda seconds: None)
+    transport = main.ResilientTransport("test", retries=2, deadline=60)
+    transport.breaker.threshold = 3
+    calls = []
+
+    def unreachable():
+        calls.append(1)
+        raise httpx.ConnectError("connection refused")
+
+    with pytest.raises(httpx.ConnectError):
+        transport.call(unreachable, idempotent=True)
+    assert len(calls) == 3
+    assert transport.breaker.state == "open"
+    with pytest.raises(main.CircuitOpenError):
+        transport.call(unreachable, idempotent=True)
+    assert len(calls) == 3
+
+
+def test_transport_never_retries_writes_or_counts_bad_requests():
+    transport = main.ResilientTransport("test", retries=2, deadline=60)
+    calls = []
+
+    def write():
+        calls.append(1)
+        raise httpx.ConnectError("connection reset")
+
+    with pytest.raises(httpx.ConnectError):
+        transport.call(write)
+    assert len(calls) == 1
+
+    def bad_request():
+        raise ValueError("invalid input")
+
+    with pytest.raises(ValueError):
+        transport.call(bad_request, idempotent=True)
+    assert transport.breaker.failures == 0
@@ -0,0 +1,115 @@
+import threading
+
+import pytest
+from werkzeug.security import generate_password_hash
+
+import main
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(main.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def throttle():
+    return main.LoginThrottle(main.MemoryBucketStore())
+
+
+def attempts_until_throttled(throttle, ip, username, limit=100):
+    for attempt in range(limit):
+        try:
+            throttle.check(ip, username)
+        except main.LoginThrottled as e:
+            return attempt, e
+    raise AssertionError("never throttled")
+
+
+def test_refill_bucket():
+    assert main.refill_bucket(1, 0, capacity=5, rate=1, now=0) == (True, 0, 0.0)
+    allowed, tokens, retry_after = main.refill_bucket(0, 0, capacity=5, rate=0.5, now=1)
+    assert (allowed, tokens, retry_after) == (False, 0.5, 1.0)
+    assert main.refill_bucket(0, 0, capacity=5, rate=1, now=1000)[1] == 4  # never more than capacity
+
+
+def test_username_is_locked_out_after_its_burst(throttle, clock):
+    allowed, error = attempts_until_throttled(throttle, "203.0.113.1", "admin")
+    assert allowed == main.LOGIN_USERNAME_BURST
+    assert error.reason == "username"
+    assert error.retry_after == pytest.approx(60 / main.LOGIN_USERNAME_PER_MINUTE)
+    assert throttle.stats()["rejections"]["username"] == 1
+
+
+def test_lockout_follows_the_username_not_its_spelling_or_address(throttle, clock):
+    for i in range(main.LOGIN_USERNAME_BURST):
+        throttle.check(f"203.0.113.{i}", "admin")
+    with pytest.raises(main.LoginThrottled):
+        throttle.check("198.51.100.7", "  ADMIN ")
+    throttle.check("198.51.100.7", "secretary")  # other accounts are unaffected
+
+
+def test_one_address_is_limited_across_usernames(throttle, clock):
+    for i in range(main.LOGIN_IP_BURST):
+        throttle.check("203.0.113.1", f"user{i}")
+    with pytest.raises(main.LoginThrottled) as caught:
+        throttle.check("203.0.113.1", "someone-else")
+    assert caught.value.reason == "ip"
+
+
+def test_lockout_resets_as_the_bucket_refills(throttle, clock):
+    attempts_until_throttled(throttle, "203.0.113.1", "admin")
+    clock[0] += 60 / main.LOGIN_USERNAME_PER_MINUTE - 1
+    with pytest.raises(main.LoginThrottled):
+        throttle.check("203.0.113.1", "admin")
+
+    clock[0] += 1
+    throttle.check("203.0.113.1", "admin")  # one token back
+    with pytest.raises(main.LoginThrottled):
+        throttle.check("203.0.113.1", "admin")
+
+    clock[0] += main.LOGIN_BUCKET_IDLE
+    allowed, _ = attempts_until_throttled(throttle, "203.0.113.1", "admin")
+    assert allowed == main.LOGIN_USERNAME_BURST  # fully refilled, but never past the burst
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "throttle.sqlite3")
+    first = main.LoginThrottle(main.SqliteBucketStore(path))
+    second = main.LoginThrottle(main.SqliteBucketStore(path))
+    for _ in range(main.LOGIN_USERNAME_BURST):
+        first.check("203.0.113.1", "admin")
+    with pytest.raises(main.LoginThrottled):
+        second.check("203.0.113.2", "admin")
+
+
+def test_password_hashing_is_refused_when_every_slot_is_busy(throttle, monkeypatch):
+    monkeypatch.setattr(main, "LOGIN_HASH_WAIT", 0.01)
+    throttle.hash_slots = threading.BoundedSemaphore(1)
+    with throttle.hashing():
+        with pytest.raises(main.LoginThrottled) as caught:
+            with throttle.hashing():
+                pass
+    assert caught.value.reason == "busy"
+    with throttle.hashing():
+        pass  # the slot is released again
+
+
+def test_login_route_answers_429_with_retry_after(db, throttle, clock, monkeypatch):
+    monkeypatch.setattr(main, "login_throttle", throttle)
+    db.table("users").insert({
+        "username": "admin", "password_hash": generate_password_hash("right"), "name": "Admin", "role": "admin",
+    }).execute()
+    client = main.app.test_client()
+
+    for _ in range(main.LOGIN_USERNAME_BURST):
+        resp = client.post("/admin/login", data={"username": "admin", "password": "wrong"})
+        assert resp.status_code == 200
+    resp = client.post("/admin/login", data={"username": "admin", "password": "right"})
+    assert resp.status_code == 429
+    assert resp.headers["Retry-After"] == str(int(60 / main.LOGIN_USERNAME_PER_MINUTE))
+
+    clock[0] += 60 / main.LOGIN_USERNAME_PER_MINUTE
+    resp = client.post("/admin/login", data={"username": "admin", "password": "right"})
+    assert resp.status_code == 302
@@ -0,0 +1,123 @@
+import base64
+import json
+
+import pytest
+
+import main
+
+# Ten posts with some shared timestamps, so ties are broken by id.
+DATES = [
+    "2025-06-01T10:00:00+08:00",
+    "2025-06-02T10:00:00+08:00",
+    "2025-06-02T10:00:00+08:00",
+    "2025-06-03T10:00:00+08:00",
+    "2025-06-04T10:00:00+08:00",
+    "2025-06-04T10:00:00+08:00",
+    "2025-06-04T10:00:00+08:00",
+    "2025-06-05T10:00:00+08:00",
+    "2025-06-06T10:00:00+08:00",
+    "2025-06-07T10:00:00+08:00",
+]
+
+
+@pytest.fixture
+def posts(db):
+    rows = [{"title": f"Post {i}", "date_posted": date, "is_active": i % 2 == 0} for i, date in enumerate(DATES)]
+    db.table("bulletin_posts").insert(rows).execute()
+    all_rows = db.table("bulletin_posts").select("id, date_posted, is_active").execute().data
+    return sorted(all_rows, key=lambda row: (row["date_posted"], row["id"]), reverse=True)
+
+
+def fetch(after=None, before=None, page_size=3, filters=None):
+    return main.fetch_keyset_page(
+        "bulletin_posts", "id, title, date_posted, is_active",
+        after=main.decode_cursor(after), before=main.decode_cursor(before), page_size=page_size, filters=filters,
+    )
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    row = {"id": 42, "date_posted": "2025-06-04T10:00:00+08:00"}
+    assert main.decode_cursor(main.encode_cursor(row)) == ("2025-06-04T10:00:00+08:00", 42)
+    assert main.decode_cursor(main.encode_cursor({"id": 7, "submitted_at": "2025-06-04T10:00:00Z"}, "submitted_at")) == (
+        "2025-06-04T10:00:00+00:00", 7
+    )
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64 at all!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    raw_cursor({"date_posted": "2025-06-04T10:00:00+08:00", "id": 1}),
+    raw_cursor(["2025-06-04T10:00:00+08:00"]),
+    raw_cursor(["2025-06-04T10:00:00+08:00", 1, 2]),
+    raw_cursor(["yesterday", 1]),
+    raw_cursor(["2025-06-04T10:00:00+08:00", "1),id.gt.(0"]),
+    raw_cursor(['2025-06-04",id.gt.0,date_posted.eq."2025', 1]),
+    raw_cursor([None, 1]),
+    "2",  # a page number from an old offset-paginated link
+])
+def test_tampered_or_foreign_cursors_are_rejected(cursor):
+    assert main.decode_cursor(cursor) is None
+
+
+def test_tampered_cursor_falls_back_to_the_first_page(posts):
+    rows, _, _ = fetch(after=raw_cursor(['2025-06-04",id.gt.0,date_posted.eq."2025', 1]))
+    assert ids(rows) == ids(posts[:3])
+
+
+def test_walking_forward_visits_every_row_once_in_order(posts):
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, next_cursor, prev_cursor = fetch(after=cursor)
+        assert (prev_cursor is None) == (cursor is None)
+        seen += ids(rows)
+        pages += 1
+        if not next_cursor:
+            break
+        cursor = next_cursor
+    assert seen == ids(posts)
+    assert pages == 4
+
+
+def test_walking_back_returns_the_same_pages(posts):
+    forward, cursor = [], None
+    while True:
+        rows, next_cursor, prev_cursor = fetch(after=cursor)
+        forward.append(ids(rows))
+        if not next_cursor:
+            break
+        cursor = next_cursor
+
+    backward = []
+    while prev_cursor:
+        rows, _, prev_cursor = fetch(before=prev_cursor)
+        backward.append(ids(rows))
+    assert backward == forward[-2::-1]
+
+
+def test_before_cursor_page_links(posts):
+    rows, next_cursor, _ = fetch()
+    rows, _, prev_cursor = fetch(after=next_cursor)
+    back, next_again, prev_again = fetch(before=prev_cursor)
+    assert ids(back) == ids(posts[:3])
+    assert next_again == next_cursor
+    assert prev_again is None
+
+
+def test_filters_apply_to_every_page(posts):
+    active = [row for row in posts if row["is_active"]]
+    first, next_cursor, _ = fetch(page_size=3, filters={"is_active": True})
+    second, last_cursor, _ = fetch(after=next_cursor, page_size=3, filters={"is_active": True})
+    assert ids(first) + ids(second) == ids(active)
+    assert last_cursor is None
+
+
+def test_empty_table(db):
+    assert fetch() == ([], None, None)
@@ -0,0 +1,91 @@
+import pytest
+
+import main
+
+BULLETINS = [
+    {"title": "Flood advisory", "content": "Barangay residents near the river should prepare.", "is_active": True},
+    {"title": "Clean-up drive", "content": "Join the barangay clean-up this Saturday.", "is_active": True},
+    {"title": "Cleanliness awards", "content": "The barangay thanks every purok.", "is_active": True},
+    {"title": "Vaccination schedule", "content": "Barangay health center, open even during a flood.", "is_active": True},
+    {"title": "Old flood notice", "content": "Barangay flood drill, now cancelled.", "is_active": False},
+]
+NEWS = [
+    {"title": "Mga mag-aaral ng Looc", "content": "Pagkilala sa mga mag-aaral ng barangay.", "is_active": True},
+    {"title": "Pista ng Señor", "content": "Barangay fiesta this May.", "is_active": True},
+]
+
+
+@pytest.fixture
+def index(db, tmp_path):
+    db.table("bulletin_posts").insert(BULLETINS).execute()
+    db.table("news_posts").insert(NEWS).execute()
+    return main.SearchIndex(main.SEARCH_TABLES, str(tmp_path / "search.json.gz"), rebuild_interval=900)
+
+
+def titles(results):
+    return [result["title"] for result in results]
+
+
+def test_tokenize_folds_accents_drops_stopwords_and_joins_hyphenated_words():
+    assert main.tokenize("Pista ng Señor") == ["pista", "senor"]
+    assert main.tokenize("Mga mag-aaral") == ["magaaral", "mag", "aaral"]
+    assert main.tokenize("the and sa ng") == []
+
+
+def test_title_matches_outrank_content_matches(index):
+    # "flood" is in one active title and one active content; the title weighs double.
+    assert titles(index.search("flood")) == ["Flood advisory", "Vaccination schedule"]
+
+
+def test_rare_terms_weigh_more_than_common_ones(index):
+    # Every post says "barangay"; only one mentions the river.
+    results = index.search("barangay river")
+    assert results[0]["title"] == "Flood advisory"
+    assert results[0]["score"] > 2 * results[1]["score"]
+
+
+def test_prefix_matches_rank_below_exact_matches(index):
+    results = index.search("clean")
+    assert titles(results) == ["Clean-up drive", "Cleanliness awards"]
+    assert results[0]["score"] > results[1]["score"]
+    assert titles(index.search("vaccin")) == ["Vaccination schedule"]
+
+
+def test_accents_and_hyphenated_words_match_either_form(index):
+    assert titles(index.search("senor")) == ["Pista ng Señor"]
+    assert titles(index.search("Señor")) == ["Pista ng Señor"]
+    assert titles(index.search("magaaral")) == titles(index.search("mag-aaral")) == ["Mga mag-aaral ng Looc"]
+
+
+def test_inactive_posts_and_other_tables_are_filtered(index):
+    assert "Old flood notice" not in titles(index.search("flood"))
+    assert "Old flood notice" in titles(index.search("flood", active_only=False))
+    assert {result["table"] for result in index.search("barangay", tables=("news_posts",))} == {"news_posts"}
+
+
+def test_stopword_only_queries_return_nothing(index):
+    assert index.search("ang mga sa") == []
+    assert index.search("") == []
+
+
+def test_writes_keep_the_index_current(index):
+    vaccination_id = next(result["id"] for result in index.search("flood") if result["title"] == "Vaccination schedule")
+    index.remove("bulletin_posts", vaccination_id)
+    index.upsert("news_posts", {"id": 99, "title": "Typhoon update", "content": "Flood warning lifted.", "is_active": True})
+
+    assert titles(index.search("flood")) == ["Flood advisory", "Typhoon update"]
+    assert titles(index.search("typhoon")) == ["Typhoon update"]
+
+
+def test_snapshot_restores_the_same_results_without_the_database(index, tmp_path, monkeypatch):
+    expected = index.search("barangay flood")
+    index.save_snapshot()
+
+    class Unreachable:
+        def table(self, name):
+            raise AssertionError("the snapshot should answer without querying")
+
+    monkeypatch.setattr(main, "supabase", Unreachable())
+    restored = main.SearchIndex(main.SEARCH_TABLES, index.snapshot_path, rebuild_interval=900)
+    assert restored.search("barangay flood") == expected
+    assert restored.stats()["snapshot_loads"] == 1
@@ -0,0 +1,49 @@
+import pytest
+
+import main
+
+
+@pytest.fixture
+def admin_client(db):
+    db.table("users").insert({"username": "admin", "password_hash": "-", "name": "Admin", "role": "admin"}).execute()
+    db.table("patch_notes").insert({"title": "v1.2", "notes": "Faster pages", "date": "2025-06-01"}).execute()
+    main.user_cache.invalidate()
+    main.status_cache.invalidate()
+    client = main.app.test_client()
+    with client.session_transaction() as session:
+        session["_user_id"] = "1"
+        session["_fresh"] = True
+    yield client
+    main.status_cache.invalidate()
+
+
+def test_unchanged_status_is_answered_with_304(admin_client):
+    resp = admin_client.get("/api/status")
+    assert resp.status_code == 200
+    assert resp.get_json()["patch_note"]["title"] == "v1.2"
+    assert resp.headers["Cache-Control"] == "private, no-cache"
+
+    again = admin_client.get("/api/status", headers={"If-None-Match": resp.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.data == b""
+
+
+def test_a_status_change_changes_the_etag(admin_client, db):
+    etag = admin_client.get("/api/status").headers["ETag"]
+    db.table("patch_notes").insert({"title": "v1.3", "notes": "Search", "date": "2025-07-01"}).execute()
+    main.status_cache.invalidate()
+
+    resp = admin_client.get("/api/status", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["patch_note"]["title"] == "v1.3"
+    assert resp.headers["ETag"] != etag
+
+
+def test_status_requires_login(db):
+    main.user_cache.invalidate()
+    assert main.app.test_client().get("/api/status").status_code == 302
+
+
+def test_event_stream_is_off_unless_enabled(admin_client):
+    assert not main.STATUS_EVENTS
+    assert admin_client.get("/api/events").status_code == 404
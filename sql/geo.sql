@@ -0,0 +1,14 @@
+-- Optional report coordinates for the admin map (see ReportGeoIndex in api/main.py).
+-- Locations are checked against api/static/looc-boundary.geojson before they are stored.
+-- That outline is hand-traced, so a point outside it is stored with outside_boundary set
+-- for the admin queue rather than rejected. The index is built from a paged scan by id,
+-- so no spatial index is needed here.
+
+alter table concern_reports
+    add column if not exists latitude double precision,
+    add column if not exists longitude double precision,
+    add column if not exists outside_boundary boolean not null default false;
+
+alter table concern_reports
+    add constraint concern_reports_coordinates_paired
+    check ((latitude is null) = (longitude is null));
@@ -0,0 +1,20 @@
+-- Reference counts for content-addressed post images (see update_image_refs in api/main.py).
+-- New uploads go to one public bucket (IMAGE_CONTENT_BUCKET, default "post-images") under
+-- their SHA-256, so bulletins and news share a single copy of the same file. Each row says
+-- one post uses one object; an object is removed once no row names it.
+
+insert into storage.buckets (id, name, public)
+values ('post-images', 'post-images', true)
+on conflict (id) do nothing;
+
+create table if not exists image_refs (
+    id bigint generated by default as identity primary key,
+    path text not null,
+    table_name text not null check (table_name in ('bulletin_posts', 'news_posts')),
+    post_id bigint not null,
+    unique (path, table_name, post_id)
+);
+
+-- unique (path, ...) already serves the "is this object still used" lookups;
+-- this one serves the per-post lookups on edit and delete.
+create index if not exists image_refs_post on image_refs (table_name, post_id);
@@ -0,0 +1,7 @@
+-- Responsive image variants for post images (see upload_image_with_variants in api/main.py).
+-- Maps a format to its width-bounded renditions, e.g.
+-- {"webp": [{"width": 320, "url": "..."}, ...], "avif": [...]}. Null for posts without an
+-- image, and for images uploaded before variants existed or that couldn't be decoded.
+
+alter table bulletin_posts add column if not exists image_variants jsonb;
+alter table news_posts add column if not exists image_variants jsonb;
@@ -0,0 +1,56 @@
+-- Tables behind the resident intake forms (/services/<kind>) in api/main.py.
+-- The admin queues page by (submitted_at, id) and filter on status, so each
+-- table gets a composite index on exactly that projection.
+
+create table if not exists certificate_requests (
+    id bigint generated by default as identity primary key,
+    reference text not null unique,
+    idempotency_key text not null unique,
+    status text not null default 'pending',
+    submitted_at timestamptz not null default now(),
+    full_name text not null,
+    address text not null,
+    contact_number text not null,
+    certificate_type text not null,
+    purpose text not null
+);
+
+create table if not exists business_permit_requests (
+    id bigint generated by default as identity primary key,
+    reference text not null unique,
+    idempotency_key text not null unique,
+    status text not null default 'pending',
+    submitted_at timestamptz not null default now(),
+    full_name text not null,
+    contact_number text not null,
+    business_name text not null,
+    business_address text not null,
+    nature_of_business text not null,
+    application_type text not null
+);
+
+create table if not exists concern_reports (
+    id bigint generated by default as identity primary key,
+    reference text not null unique,
+    idempotency_key text not null unique,
+    status text not null default 'pending',
+    submitted_at timestamptz not null default now(),
+    full_name text not null,
+    contact_number text,
+    category text not null,
+    location text not null,
+    details text not null
+);
+
+create index if not exists certificate_requests_status_submitted
+    on certificate_requests (status, submitted_at desc, id desc);
+create index if not exists certificate_requests_submitted
+    on certificate_requests (submitted_at desc, id desc);
+create index if not exists business_permit_requests_status_submitted
+    on business_permit_requests (status, submitted_at desc, id desc);
+create index if not exists business_permit_requests_submitted
+    on business_permit_requests (submitted_at desc, id desc);
+create index if not exists concern_reports_status_submitted
+    on concern_reports (status, submitted_at desc, id desc);
+create index if not exists concern_reports_submitted
+    on concern_reports (submitted_at desc, id desc);